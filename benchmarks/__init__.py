@@ -0,0 +1 @@
+"""Offline benchmarks for the Google Fit integration."""
@@ -0,0 +1,574 @@
+"""Local stand-in for the Google Fit REST API.
+
+Serves datasets.get, dataPointChanges.list, sessions.list, dataset.aggregate,
+dataSources.list, batch requests and the discovery document, with generated data
+for every data source the integration knows about. Latency, error rates,
+pagination and payload sizes are configurable, and every request is counted so
+quota use can be measured.
+
+Run on its own with:
+
+    python -m benchmarks.fake_server --port 8080 --latency 0.05 --error-rate 0.01
+
+Then point the integration at it with the URLs it prints.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+import json
+import random
+import re
+import sys
+import time
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+import uuid
+
+from aiohttp import web
+from googleapiclient.discovery_cache import get_static_doc
+
+from custom_components.google_fit.api_types import (
+    LastPointSensorDescription,
+    SumPointsSensorDescription,
+)
+from custom_components.google_fit.const import (
+    ACTIVITY_TYPES,
+    ENTITY_DESCRIPTIONS,
+    NANOSECONDS_SECONDS_CONVERSION,
+    SLEEP_ACTIVITY_ID,
+)
+
+from .payloads import (
+    DAY_SECONDS,
+    make_data_point_changes,
+    make_sessions,
+    make_sleep_segments,
+    make_sum_object,
+)
+
+SERVICE_PATH = "fitness/v1/"
+# As given in the discovery document
+BATCH_PATH = "batch"
+
+# Google API error statuses for each HTTP status
+ERROR_STATUSES = {
+    401: "UNAUTHENTICATED",
+    403: "PERMISSION_DENIED",
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+_DATASET = re.compile(r"users/me/dataSources/([^/]+)/datasets/(\d+)-(\d+)")
+_DATA_POINT_CHANGES = re.compile(r"users/me/dataSources/([^/]+)/dataPointChanges")
+_SESSIONS = re.compile(r"users/me/sessions")
+_DATA_SOURCES = re.compile(r"users/me/dataSources")
+_AGGREGATE = re.compile(r"users/me/dataset:aggregate")
+
+
+@dataclass
+class FakeServerConfig:
+    """Behaviour of the fake server."""
+
+    # Fixed delay added to every HTTP request, plus a random amount up to jitter
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # Chance of any single API call failing, and the status it fails with
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Sent with 429 responses
+    retry_after: int = 1
+    # Maximum items per response page. Unpaginated if None
+    page_size: int | None = None
+    # Points in each summed dataset, spread evenly over the requested range
+    points_per_dataset: int = 288
+    # Points in each data point change history
+    change_points: int = 1000
+    sleep_segments_per_night: int = 40
+    sessions_per_day: int = 1
+    seed: int = 0
+
+
+@dataclass
+class FakeServerStats:
+    """Counts of what the fake server has served."""
+
+    http_requests: int = 0
+    api_calls: Counter[str] = field(default_factory=Counter)
+    errors: Counter[int] = field(default_factory=Counter)
+    bytes_sent: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats as plain JSON serialisable types."""
+        return {
+            "http_requests": self.http_requests,
+            "api_calls": dict(self.api_calls),
+            "errors": {str(status): count for status, count in self.errors.items()},
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def _activity_types(query: dict[str, str]) -> tuple[int, ...]:
+    """Return the activities sessions cycle through for a sessions.list query.
+
+    Without an activityType filter, sessions of every known activity are listed.
+    """
+    if "activityType" in query:
+        return (int(query["activityType"]),)
+    return (SLEEP_ACTIVITY_ID, *ACTIVITY_TYPES)
+
+
+def _source_types() -> dict[str, tuple[bool, int]]:
+    """Return whether each known data source is int valued and its value count."""
+    sources: dict[str, tuple[bool, int]] = {}
+    for entity in ENTITY_DESCRIPTIONS:
+        if isinstance(entity, SumPointsSensorDescription | LastPointSensorDescription):
+            index = getattr(entity, "index", 0)
+            _, values = sources.get(entity.source, (entity.is_int, 1))
+            sources[entity.source] = (entity.is_int, max(values, index + 1))
+    return sources
+
+
+class FakeFitServer:
+    """An aiohttp server which behaves like the Google Fit API."""
+
+    def __init__(self, config: FakeServerConfig | None = None) -> None:
+        """Initialise the server. Call start() to begin serving."""
+        self.config = config or FakeServerConfig()
+        self.stats = FakeServerStats()
+        self._rng = random.Random(self.config.seed)
+        self._sources = _source_types()
+        self._sleep_sources = {
+            entity.source
+            for entity in ENTITY_DESCRIPTIONS
+            if isinstance(entity, SumPointsSensorDescription) and entity.is_sleep
+        }
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+        self.app = web.Application()
+        self.app.router.add_get("/{api}/$discovery/rest", self._handle_discovery)
+        self.app.router.add_post(f"/{BATCH_PATH}", self._handle_batch)
+        self.app.router.add_route("*", f"/{SERVICE_PATH}{{path:.*}}", self._handle_api)
+
+    @property
+    def base_url(self) -> str:
+        """Return the REST API base URL, for AsyncConfigEntryAuth."""
+        return f"{self.url}/{SERVICE_PATH.rstrip('/')}"
+
+    @property
+    def discovery_url(self) -> str:
+        """Return the discovery URL template, for DiscoveryDocumentCache."""
+        return f"{self.url}/{{api}}/$discovery/rest?version={{apiVersion}}"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start serving. A free port is chosen if port is 0."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> None:
+        """Simulate network and server latency."""
+        delay = self.config.latency + self._rng.uniform(0, self.config.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _json(
+        self, status: int, body: Any, headers: dict[str, str] | None = None
+    ) -> web.Response:
+        """Return a JSON response and count the bytes sent."""
+        text = json.dumps(body)
+        self.stats.bytes_sent += len(text)
+        return web.Response(
+            status=status, text=text, content_type="application/json", headers=headers
+        )
+
+    async def _handle_discovery(self, request: web.Request) -> web.Response:
+        """Serve the bundled discovery document, rewritten to point at this server."""
+        self.stats.http_requests += 1
+        self.stats.api_calls["discovery"] += 1
+        await self._delay()
+        document = json.loads(
+            get_static_doc(request.match_info["api"], request.query["version"])
+        )
+        document["rootUrl"] = f"{self.url}/"
+        document["mtlsRootUrl"] = f"{self.url}/"
+        document["baseUrl"] = f"{self.url}/{document['servicePath']}"
+        etag = f'"{self.config.seed}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return self._json(200, document, {"ETag": etag})
+
+    async def _handle_api(self, request: web.Request) -> web.Response:
+        """Serve a single API call."""
+        self.stats.http_requests += 1
+        await self._delay()
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return self._json(*self._error(401, "Missing bearer token"))
+        status, body, headers = self._call(
+            request.method,
+            request.match_info["path"],
+            dict(request.query),
+            await request.json() if request.can_read_body else None,
+        )
+        return self._json(status, body, headers)
+
+    async def _handle_batch(self, request: web.Request) -> web.Response:
+        """Serve a multipart batch of API calls."""
+        self.stats.http_requests += 1
+        self.stats.api_calls["batch"] += 1
+        await self._delay()
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return self._json(*self._error(401, "Missing bearer token"))
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {request.headers['Content-Type']}\r\n\r\n".encode()
+            + await request.read()
+        )
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.iter_parts():
+            head, _, content = (
+                part.get_payload(decode=True)
+                .decode()
+                .replace("\r\n", "\n")
+                .partition("\n\n")
+            )
+            method, target, _ = head.partition("\n")[0].split(" ", 2)
+            url = urlsplit(target)
+            status, body, _ = self._call(
+                method,
+                url.path.removeprefix(f"/{SERVICE_PATH}"),
+                {key: values[0] for key, values in parse_qs(url.query).items()},
+                json.loads(content) if content.strip() else None,
+            )
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(body)}\r\n"
+            )
+        text = "".join(parts) + f"--{boundary}--\r\n"
+        self.stats.bytes_sent += len(text)
+        return web.Response(
+            body=text.encode(),
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+        )
+
+    def _error(
+        self, status: int, message: str
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return a Google style error response."""
+        self.stats.errors[status] += 1
+        headers = {"Retry-After": str(self.config.retry_after)} if status == 429 else {}
+        body = {
+            "error": {
+                "code": status,
+                "message": message,
+                "status": ERROR_STATUSES.get(status, "UNKNOWN"),
+            }
+        }
+        return status, body, headers
+
+    def _call(
+        self,
+        method: str,
+        path: str,
+        query: dict[str, str],
+        body: dict[str, Any] | None = None,
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Route one API call and return its status, body and headers."""
+        path = unquote(path)
+        is_aggregate = _AGGREGATE.fullmatch(path) is not None
+        if method != ("POST" if is_aggregate else "GET"):
+            return self._error(405, f"{method} is not supported")
+        if self._rng.random() < self.config.error_rate:
+            return self._error(self.config.error_status, "Injected error")
+
+        if is_aggregate:
+            self.stats.api_calls["dataset.aggregate"] += 1
+            return self._aggregate(body or {})
+        if match := _DATASET.fullmatch(path):
+            self.stats.api_calls["datasets.get"] += 1
+            return self._dataset(
+                match[1], int(match[2]), int(match[3]), query.get("limit")
+            )
+        if match := _DATA_POINT_CHANGES.fullmatch(path):
+            self.stats.api_calls["dataPointChanges.list"] += 1
+            return self._data_point_changes(match[1], query.get("pageToken"))
+        if _SESSIONS.fullmatch(path):
+            self.stats.api_calls["sessions.list"] += 1
+            return self._sessions(query)
+        if _DATA_SOURCES.fullmatch(path):
+            self.stats.api_calls["dataSources.list"] += 1
+            return (
+                200,
+                {
+                    "dataSource": [
+                        {
+                            "dataStreamId": source,
+                            "dataStreamName": "",
+                            "type": "derived",
+                        }
+                        for source in self._sources
+                    ]
+                },
+                {},
+            )
+        return self._error(404, f"Unknown path: {path}")
+
+    def _page(
+        self, items: list[Any], page_token: str | None
+    ) -> tuple[list[Any], str | None]:
+        """Return one page of items and the token for the next page."""
+        if self.config.page_size is None:
+            return items, None
+        offset = int(page_token or 0)
+        end = offset + self.config.page_size
+        return items[offset:end], str(end) if end < len(items) else None
+
+    def _dataset(
+        self, source: str, start_ns: int, end_ns: int, limit: str | None
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return the points of a source between two times."""
+        if source not in self._sources:
+            return self._error(404, f"Unknown data source: {source}")
+        start_s = start_ns / NANOSECONDS_SECONDS_CONVERSION
+        end_s = end_ns / NANOSECONDS_SECONDS_CONVERSION
+        if source in self._sleep_sources:
+            nights = max(round((end_s - start_s) / DAY_SECONDS), 1)
+            response = make_sleep_segments(
+                nights, self.config.sleep_segments_per_night, end_s=end_s
+            )
+        else:
+            is_int, _ = self._sources[source]
+            response = make_sum_object(
+                self.config.points_per_dataset,
+                is_int,
+                seed=self.config.seed,
+                end_s=end_s,
+                start_s=start_s,
+            )
+        response["dataSourceId"] = source
+        if limit is not None:
+            # Google applies the limit from the newest end of the range
+            response["point"] = response["point"][-int(limit) :]
+        return 200, response, {}
+
+    def _aggregate(
+        self, body: dict[str, Any]
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return the total of each requested source, in a single time bucket.
+
+        Totals are of the same points datasets.get would return for the range.
+        Splitting the range into several buckets is not supported.
+        """
+        start_ms = int(body.get("startTimeMillis", 0))
+        end_ms = int(body.get("endTimeMillis", 0))
+        datasets = []
+        for aggregate_by in body.get("aggregateBy", []):
+            source = aggregate_by.get("dataSourceId")
+            if source not in self._sources or source in self._sleep_sources:
+                return self._error(400, f"Cannot aggregate data source: {source}")
+            is_int, _ = self._sources[source]
+            points = make_sum_object(
+                self.config.points_per_dataset,
+                is_int,
+                seed=self.config.seed,
+                end_s=end_ms / 1000,
+                start_s=start_ms / 1000,
+            )["point"]
+            key = "intVal" if is_int else "fpVal"
+            total = sum(point["value"][0][key] for point in points)
+            datasets.append(
+                {
+                    "dataSourceId": f"{source}:aggregated",
+                    "point": [
+                        {
+                            "dataTypeName": points[0]["dataTypeName"],
+                            "startTimeNanos": str(start_ms * 1_000_000),
+                            "endTimeNanos": str(end_ms * 1_000_000),
+                            "originDataSourceId": source,
+                            "value": [{key: total}],
+                        }
+                    ]
+                    if points
+                    else [],
+                }
+            )
+        bucket = {
+            "startTimeMillis": str(start_ms),
+            "endTimeMillis": str(end_ms),
+            "dataset": datasets,
+        }
+        return 200, {"bucket": [bucket]}, {}
+
+    def _data_point_changes(
+        self, source: str, page_token: str | None
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return the data point change history of a source."""
+        if source not in self._sources:
+            return self._error(404, f"Unknown data source: {source}")
+        is_int, values = self._sources[source]
+        response = make_data_point_changes(
+            self.config.change_points,
+            is_int,
+            values_per_point=values,
+            seed=self.config.seed,
+        )
+        response["dataSourceId"] = source
+        response["insertedDataPoint"], next_page = self._page(
+            response["insertedDataPoint"], page_token
+        )
+        response["nextPageToken"] = next_page or ""
+        return 200, response, {}
+
+    def _sessions(
+        self, query: dict[str, str]
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return the sessions which end between the start and end time."""
+        if "startTime" not in query and "endTime" not in query:
+            return self._session_changes(query)
+        end_s = datetime.fromisoformat(query["endTime"]).timestamp()
+        start_s = datetime.fromisoformat(query["startTime"]).timestamp()
+        spacing = DAY_SECONDS / max(self.config.sessions_per_day, 1)
+        response = make_sessions(
+            int((end_s - start_s) / spacing) + 1,
+            seed=self.config.seed,
+            end_s=end_s,
+            spacing_s=spacing,
+            activity_types=_activity_types(query),
+        )
+        sessions = [
+            session
+            for session in response["session"]
+            if start_s * 1000 <= int(session["endTimeMillis"]) <= end_s * 1000
+        ]
+        response["session"], response["nextPageToken"] = self._page(
+            sessions, query.get("pageToken")
+        )
+        response["hasMoreData"] = response["nextPageToken"] is not None
+        return 200, response, {}
+
+    def _session_changes(
+        self, query: dict[str, str]
+    ) -> tuple[int, dict[str, Any], dict[str, str]]:
+        """Return the sessions changed since a sync token, and the next token.
+
+        Sessions end on a fixed grid and are last modified when they end, so each
+        is returned once. Without a token, sessions changed in the last 30 days
+        are returned. Tokens are the time of the sync, with the offset of the next
+        page if the changes do not fit in one.
+        """
+        now_ms = int(time.time() * 1000)
+        since_ms, _, offset = query.get("pageToken", "").partition(":")
+        since = int(since_ms) if since_ms else now_ms - 30 * DAY_SECONDS * 1000
+        spacing = DAY_SECONDS / max(self.config.sessions_per_day, 1)
+        last_end = now_ms - now_ms % int(spacing * 1000)
+        response = make_sessions(
+            int((last_end - since) / (spacing * 1000)) + 1,
+            seed=self.config.seed,
+            end_s=last_end / 1000,
+            spacing_s=spacing,
+            activity_types=_activity_types(query),
+        )
+        sessions = []
+        for session in response["session"]:
+            if int(session["modifiedTimeMillis"]) > since:
+                session["id"] = f"session-{session['endTimeMillis']}"
+                sessions.append(session)
+        response["session"], next_offset = self._page(sessions, offset or None)
+        response["deletedSession"] = []
+        response["hasMoreData"] = next_offset is not None
+        response["nextPageToken"] = (
+            f"{since}:{next_offset}" if next_offset is not None else str(now_ms)
+        )
+        return 200, response, {}
+
+
+def get_config_parser() -> argparse.ArgumentParser:
+    """Return an argument parser for the fake server options."""
+    parser = argparse.ArgumentParser(add_help=False)
+    defaults = FakeServerConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--latency-jitter", type=float, default=defaults.latency_jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--page-size", type=int, default=defaults.page_size)
+    parser.add_argument(
+        "--points-per-dataset", type=int, default=defaults.points_per_dataset
+    )
+    parser.add_argument("--change-points", type=int, default=defaults.change_points)
+    parser.add_argument(
+        "--sessions-per-day", type=int, default=defaults.sessions_per_day
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> FakeServerConfig:
+    """Return a server config from parsed arguments."""
+    return FakeServerConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        page_size=args.page_size,
+        points_per_dataset=args.points_per_dataset,
+        change_points=args.change_points,
+        sessions_per_day=args.sessions_per_day,
+        seed=args.seed,
+    )
+
+
+async def _serve(host: str, port: int, config: FakeServerConfig) -> None:
+    """Serve until cancelled."""
+    server = FakeFitServer(config)
+    await server.start(host, port)
+    sys.stdout.write(
+        f"Serving fake Google Fit API\n"
+        f"  base URL:      {server.base_url}\n"
+        f"  discovery URL: {server.discovery_url}\n"
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        sys.stdout.write(json.dumps(server.stats.as_dict(), indent=2) + "\n")
+        await server.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the fake server from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], parents=[get_config_parser()]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_serve(args.host, args.port, config_from_args(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Load test the coordinator against the local fake Google Fit API.
+
+Starts the fake server, creates a coordinator for each simulated account and
+refreshes them all concurrently, for a number of rounds. Every account shares one
+Home Assistant instance and discovery cache, as they would in a real install.
+
+    python -m benchmarks.load --accounts 50 --transport aiohttp --latency 0.05
+
+Reports refresh latency per account, and the API calls and errors the server saw
+for each round. Later rounds only query the data sources the scheduler considers
+due, so use --interval to wait between rounds.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+import inspect
+import json
+import statistics
+import sys
+import tempfile
+import time
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.google_fit.api import AsyncConfigEntryAuth
+from custom_components.google_fit.const import (
+    ACTIVITY_TYPES,
+    API_TRANSPORTS,
+    CONF_ACTIVITY_SESSIONS,
+    CONF_ADAPTIVE_POLLING,
+    CONF_AGGREGATE_SUMS,
+    CONF_API_TRANSPORT,
+    CONF_BOUNDED_LATEST_POINT,
+    CONF_INCREMENTAL_FETCH,
+    CONF_INCREMENTAL_SESSIONS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_SOURCE_DISCOVERY,
+    DEFAULT_API_TRANSPORT,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+)
+from custom_components.google_fit.coordinator import Coordinator
+from custom_components.google_fit.discovery import DiscoveryDocumentCache
+from custom_components.google_fit.scheduler import get_account_scheduler
+
+from .fake_server import FakeFitServer, config_from_args, get_config_parser
+
+
+class StaticTokenSession:
+    """Stand-in for OAuth2Session which always holds a valid token."""
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+        """Initialise with a token unique to the config entry."""
+        self.hass = hass
+        self.config_entry = config_entry
+        self.token = {
+            CONF_ACCESS_TOKEN: f"fake-token-{config_entry.entry_id}",
+            "expires_at": time.time() + 3600,
+        }
+
+    @property
+    def valid_token(self) -> bool:
+        """Return that the token is always valid."""
+        return True
+
+    async def async_ensure_token_valid(self) -> None:
+        """Do nothing, as the token never expires."""
+
+
+@dataclass
+class RoundResult:
+    """Results of refreshing every account once."""
+
+    round: int
+    accounts: int
+    failed: int
+    wall_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+    max_seconds: float
+    http_requests: int
+    api_calls: dict[str, int]
+    errors: dict[str, int]
+
+
+def _make_entry(index: int, options: dict[str, Any]) -> ConfigEntry:
+    """Return a config entry for one simulated account."""
+    kwargs: dict[str, Any] = {}
+    if "discovery_keys" in inspect.signature(ConfigEntry).parameters:
+        # Required from Home Assistant 2024.10, and unknown before it
+        kwargs["discovery_keys"] = MappingProxyType({})
+    return ConfigEntry(
+        **kwargs,
+        data={"auth_implementation": DOMAIN, "token": {}},
+        domain=DOMAIN,
+        minor_version=1,
+        options=options,
+        source="user",
+        title=f"Load test account {index}",
+        unique_id=f"load-test-{index}",
+        version=1,
+    )
+
+
+async def _refresh(coordinator: Coordinator) -> tuple[float, bool]:
+    """Refresh one coordinator and return the time taken and whether it succeeded."""
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    return time.perf_counter() - start, coordinator.last_update_success
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    """Return a percentile of a list of values."""
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def _difference(after: dict[str, int], before: dict[str, int]) -> dict[str, int]:
+    """Return the non-zero differences between two sets of counters."""
+    return {
+        key: value - before.get(key, 0)
+        for key, value in after.items()
+        if value != before.get(key, 0)
+    }
+
+
+async def run_load(
+    server: FakeFitServer,
+    accounts: int,
+    rounds: int,
+    interval: float,
+    options: dict[str, Any],
+) -> list[RoundResult]:
+    """Refresh the given number of accounts against a running fake server."""
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        try:
+            discovery_cache = DiscoveryDocumentCache(hass, server.discovery_url)
+            await discovery_cache.async_load()
+            websession = async_get_clientsession(hass)
+            connections = get_account_scheduler(hass).connections
+
+            coordinators = []
+            for index in range(accounts):
+                entry = _make_entry(index, options)
+                auth = AsyncConfigEntryAuth(
+                    websession,
+                    StaticTokenSession(hass, entry),
+                    discovery_cache,
+                    server.base_url,
+                    connections,
+                )
+                coordinators.append(Coordinator(hass=hass, auth=auth, config=entry))
+
+            for round_number in range(1, rounds + 1):
+                before = server.stats.as_dict()
+                start = time.perf_counter()
+                refreshes = await asyncio.gather(
+                    *(_refresh(coordinator) for coordinator in coordinators)
+                )
+                wall_seconds = time.perf_counter() - start
+                after = server.stats.as_dict()
+
+                latencies = [seconds for seconds, _ in refreshes]
+                results.append(
+                    RoundResult(
+                        round=round_number,
+                        accounts=accounts,
+                        failed=sum(1 for _, success in refreshes if not success),
+                        wall_seconds=wall_seconds,
+                        p50_seconds=_percentile(latencies, 50),
+                        p95_seconds=_percentile(latencies, 95),
+                        max_seconds=max(latencies),
+                        http_requests=after["http_requests"] - before["http_requests"],
+                        api_calls=_difference(after["api_calls"], before["api_calls"]),
+                        errors=_difference(after["errors"], before["errors"]),
+                    )
+                )
+                sys.stderr.write(f"Round {round_number} done\n")
+                if round_number < rounds:
+                    await asyncio.sleep(interval)
+        finally:
+            await hass.async_stop(force=True)
+    return results
+
+
+def _format_table(results: list[RoundResult]) -> str:
+    """Return the round results as a plain text table."""
+    header = (
+        f"{'round':>5}{'failed':>8}{'wall s':>9}{'p50 s':>9}{'p95 s':>9}"
+        f"{'max s':>9}{'HTTP':>8}  API calls"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        calls = ", ".join(
+            f"{endpoint}={count}"
+            for endpoint, count in sorted(result.api_calls.items())
+        )
+        if result.errors:
+            calls += "  errors: " + ", ".join(
+                f"{status}={count}" for status, count in sorted(result.errors.items())
+            )
+        lines.append(
+            f"{result.round:>5}{result.failed:>8}{result.wall_seconds:>9.2f}"
+            f"{result.p50_seconds:>9.2f}{result.p95_seconds:>9.2f}"
+            f"{result.max_seconds:>9.2f}{result.http_requests:>8}  {calls}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+async def _main(args: argparse.Namespace) -> list[RoundResult]:
+    """Start the fake server and run the load test against it."""
+    options = {
+        CONF_SCAN_INTERVAL: args.scan_interval,
+        CONF_API_TRANSPORT: args.transport,
+        CONF_MAX_CONCURRENT_REQUESTS: args.concurrency,
+        CONF_INCREMENTAL_FETCH: args.incremental_fetch,
+        CONF_BOUNDED_LATEST_POINT: args.bounded_latest_point,
+        CONF_ADAPTIVE_POLLING: args.adaptive_polling,
+        CONF_SOURCE_DISCOVERY: args.source_discovery,
+        CONF_AGGREGATE_SUMS: args.aggregate_sums,
+        CONF_INCREMENTAL_SESSIONS: args.incremental_sessions,
+        CONF_ACTIVITY_SESSIONS: (
+            [str(activity_id) for activity_id in ACTIVITY_TYPES]
+            if args.activity_sessions
+            else []
+        ),
+    }
+    server = FakeFitServer(config_from_args(args))
+    await server.start()
+    try:
+        return await run_load(
+            server, args.accounts, args.rounds, args.interval, options
+        )
+    finally:
+        await server.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the load test from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], parents=[get_config_parser()]
+    )
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--interval", type=float, default=0, help="seconds to wait between rounds"
+    )
+    parser.add_argument(
+        "--transport", choices=API_TRANSPORTS, default=DEFAULT_API_TRANSPORT
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_MAX_CONCURRENT_REQUESTS
+    )
+    parser.add_argument(
+        "--scan-interval",
+        type=int,
+        default=DEFAULT_SCAN_INTERVAL,
+        help="update interval in minutes",
+    )
+    parser.add_argument("--incremental-fetch", action="store_true")
+    parser.add_argument("--bounded-latest-point", action="store_true")
+    parser.add_argument("--adaptive-polling", action="store_true")
+    parser.add_argument("--source-discovery", action="store_true")
+    parser.add_argument("--aggregate-sums", action="store_true")
+    parser.add_argument("--incremental-sessions", action="store_true")
+    parser.add_argument(
+        "--activity-sessions",
+        action="store_true",
+        help="add a session sensor for every activity",
+    )
+    parser.add_argument("--output", help="write a JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(_main(args))
+    sys.stdout.write(_format_table(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "arguments": vars(args),
+                    "rounds": [asdict(result) for result in results],
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Benchmark the GoogleFitParse hot paths against synthetic payloads.
+
+Run from the repository root:
+
+    python -m benchmarks.parse --points 10000 100000 --output report.json
+    python -m benchmarks.parse --compare report.json
+
+Each case is timed over several repeats and the best time is used for throughput.
+Peak memory is measured with tracemalloc in a separate, untimed call so tracing
+does not distort the timings. Reports are JSON and can be compared against an
+earlier run to catch regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from custom_components.google_fit.api import GoogleFitParse
+from custom_components.google_fit.api_types import SumSessionSensorDescription
+from custom_components.google_fit.const import ENTITY_DESCRIPTIONS
+
+from .payloads import (
+    make_data_point_changes,
+    make_sessions,
+    make_sleep_segments,
+    make_sum_object,
+)
+
+DEFAULT_POINTS = (10_000, 100_000, 1_000_000)
+SLEEP_SEGMENTS_PER_NIGHT = 40
+
+
+@dataclass
+class BenchmarkCase:
+    """A parser function to time and the payload it is given."""
+
+    name: str
+    make_payload: Callable[[int], Any]
+    run: Callable[[Any], Any]
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings for one case at one payload size."""
+
+    case: str
+    points: int
+    repeats: int
+    best_seconds: float
+    mean_seconds: float
+    points_per_second: float
+    peak_memory_kib: float
+
+
+def _session_entity() -> SumSessionSensorDescription:
+    """Return the first session sensor description."""
+    return next(
+        entity
+        for entity in ENTITY_DESCRIPTIONS
+        if isinstance(entity, SumSessionSensorDescription)
+    )
+
+
+def get_cases() -> list[BenchmarkCase]:
+    """Return every benchmark case.
+
+    Parsers cache work per response, so every run uses a new parser.
+    """
+    session_entity = _session_entity()
+
+    def _latest_data_shared(payload: Any) -> None:
+        # Two sensors updated from one response, like blood pressure
+        parser = GoogleFitParse()
+        parser._get_latest_data_float(payload, 0)
+        parser._get_latest_data_float(payload, 1)
+
+    return [
+        BenchmarkCase(
+            "sum_points_int",
+            lambda points: make_sum_object(points, is_int=True),
+            lambda payload: GoogleFitParse()._sum_points_int(payload),
+        ),
+        BenchmarkCase(
+            "sum_points_float",
+            lambda points: make_sum_object(points, is_int=False),
+            lambda payload: GoogleFitParse()._sum_points_float(payload),
+        ),
+        BenchmarkCase(
+            "latest_data_int",
+            lambda points: make_data_point_changes(points, is_int=True),
+            lambda payload: GoogleFitParse()._get_latest_data_int(payload),
+        ),
+        BenchmarkCase(
+            "latest_data_float",
+            lambda points: make_data_point_changes(points, is_int=False),
+            lambda payload: GoogleFitParse()._get_latest_data_float(payload),
+        ),
+        BenchmarkCase(
+            "latest_data_shared",
+            lambda points: make_data_point_changes(
+                points, is_int=False, values_per_point=2
+            ),
+            _latest_data_shared,
+        ),
+        BenchmarkCase(
+            "parse_sleep",
+            lambda points: make_sleep_segments(
+                max(points // SLEEP_SEGMENTS_PER_NIGHT, 1), SLEEP_SEGMENTS_PER_NIGHT
+            ),
+            lambda payload: GoogleFitParse()._parse_sleep(payload),
+        ),
+        BenchmarkCase(
+            "parse_session",
+            make_sessions,
+            lambda payload: GoogleFitParse()._parse_session(session_entity, payload),
+        ),
+    ]
+
+
+def run_case(case: BenchmarkCase, points: int, repeats: int) -> BenchmarkResult:
+    """Time a single case at the given payload size."""
+    payload = case.make_payload(points)
+
+    tracemalloc.start()
+    case.run(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        case.run(payload)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return BenchmarkResult(
+        case=case.name,
+        points=points,
+        repeats=repeats,
+        best_seconds=best,
+        mean_seconds=statistics.fmean(timings),
+        points_per_second=points / best if best > 0 else float("inf"),
+        peak_memory_kib=peak / 1024,
+    )
+
+
+def _format_table(
+    results: list[BenchmarkResult], baseline: dict[tuple[str, int], dict] | None
+) -> str:
+    """Return the results as a plain text table."""
+    header = (
+        f"{'case':<26}{'points':>10}{'best ms':>12}{'Mpoints/s':>12}{'peak KiB':>12}"
+    )
+    if baseline is not None:
+        header += f"{'change':>10}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        line = (
+            f"{result.case:<26}{result.points:>10}"
+            f"{result.best_seconds * 1000:>12.2f}"
+            f"{result.points_per_second / 1e6:>12.2f}"
+            f"{result.peak_memory_kib:>12.1f}"
+        )
+        if baseline is not None:
+            previous = baseline.get((result.case, result.points))
+            if previous is None:
+                line += f"{'new':>10}"
+            else:
+                change = result.best_seconds / previous["best_seconds"] - 1
+                line += f"{change:>+10.1%}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def _find_regressions(
+    results: list[BenchmarkResult],
+    baseline: dict[tuple[str, int], dict],
+    max_regression: float,
+) -> list[str]:
+    """Return the cases which are slower than the baseline by more than allowed."""
+    regressions = []
+    for result in results:
+        previous = baseline.get((result.case, result.points))
+        if previous is None:
+            continue
+        change = result.best_seconds / previous["best_seconds"] - 1
+        if change > max_regression:
+            regressions.append(f"{result.case} ({result.points} points): {change:+.1%}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmarks and return the process exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--points",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_POINTS),
+        help="payload sizes in data points",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--case",
+        action="append",
+        dest="cases",
+        help="only run the named case. May be given more than once",
+    )
+    parser.add_argument("--output", help="write a JSON report to this file")
+    parser.add_argument("--compare", help="compare against an earlier JSON report")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="exit with an error if any case is slower than the compared report by "
+        "more than this fraction, e.g. 0.1",
+    )
+    args = parser.parse_args(argv)
+
+    cases = [
+        case for case in get_cases() if args.cases is None or case.name in args.cases
+    ]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = {
+                (result["case"], result["points"]): result
+                for result in json.load(file)["results"]
+            }
+
+    results = []
+    for points in args.points:
+        for case in cases:
+            results.append(run_case(case, points, args.repeats))
+            sys.stderr.write(f"{case.name} with {points} points done\n")
+
+    sys.stdout.write(_format_table(results, baseline))
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": [asdict(result) for result in results],
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if baseline is not None and args.max_regression is not None:
+        regressions = _find_regressions(results, baseline, args.max_regression)
+        if regressions:
+            sys.stderr.write("Regressions found:\n  " + "\n  ".join(regressions) + "\n")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Synthetic Google Fit API payloads for benchmarking.
+
+Payloads mirror the shape of real API responses closely enough to exercise every
+branch of the parser. All generators are deterministic for a given seed.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from custom_components.google_fit.api_types import (
+    FitnessDataPoint,
+    FitnessObject,
+    FitnessPoint,
+    FitnessSession,
+    FitnessSessionResponse,
+)
+from custom_components.google_fit.const import NANOSECONDS_SECONDS_CONVERSION
+
+DAY_SECONDS = 24 * 60 * 60
+
+# Relative frequency of each sleep stage enum in a fragmented night
+SLEEP_STAGE_WEIGHTS = {1: 8, 2: 2, 4: 50, 5: 20, 6: 20}
+
+
+def _point(
+    data_type: str,
+    start_s: float,
+    end_s: float,
+    values: list[dict],
+) -> FitnessPoint:
+    """Return a single data point between two times in seconds."""
+    return FitnessPoint(
+        dataTypeName=data_type,
+        startTimeNanos=str(int(start_s * NANOSECONDS_SECONDS_CONVERSION)),
+        endTimeNanos=str(int(end_s * NANOSECONDS_SECONDS_CONVERSION)),
+        modifiedTimeMillis=str(int(end_s * 1000)),
+        rawTimestampNanos="0",
+        value=values,
+    )
+
+
+def make_sum_object(
+    points: int,
+    is_int: bool,
+    seed: int = 0,
+    end_s: float | None = None,
+    start_s: float | None = None,
+) -> FitnessObject:
+    """Return a dataset of short consecutive points, like steps or calories.
+
+    Points cover the day before end_s, unless start_s is given.
+    """
+    rng = random.Random(seed)
+    end_s = time.time() if end_s is None else end_s
+    start_s = end_s - DAY_SECONDS if start_s is None else start_s
+    step = (end_s - start_s) / max(points, 1)
+    data_type = "com.google.step_count.delta" if is_int else "com.google.calories"
+    point_list = []
+    for index in range(points):
+        point_start = start_s + index * step
+        value = (
+            {"intVal": rng.randint(0, 120)}
+            if is_int
+            else {"fpVal": rng.uniform(0, 5), "mapVal": []}
+        )
+        point_list.append(_point(data_type, point_start, point_start + step, [value]))
+    return FitnessObject(
+        dataSourceId=f"derived:{data_type}:com.google.android.gms:merged",
+        minStartTimeNs=str(int(start_s * NANOSECONDS_SECONDS_CONVERSION)),
+        maxEndTimeNs=str(int(end_s * NANOSECONDS_SECONDS_CONVERSION)),
+        point=point_list,
+    )
+
+
+def make_data_point_changes(
+    points: int,
+    is_int: bool,
+    years: float = 5,
+    values_per_point: int = 1,
+    seed: int = 0,
+    end_s: float | None = None,
+) -> FitnessDataPoint:
+    """Return a data point change history, like a multi-year weight log.
+
+    Points are spread evenly over the given number of years and shuffled, as the
+    API makes no promise about their order.
+    """
+    rng = random.Random(seed)
+    end_s = time.time() if end_s is None else end_s
+    start_s = end_s - years * 365 * DAY_SECONDS
+    step = (end_s - start_s) / max(points, 1)
+    data_type = "com.google.blood_pressure" if values_per_point > 1 else "weight"
+    point_list = []
+    for index in range(points):
+        point_time = start_s + index * step
+        values = [
+            {"intVal": rng.randint(40, 180)}
+            if is_int
+            else {"fpVal": rng.uniform(40, 180), "mapVal": []}
+            for _ in range(values_per_point)
+        ]
+        point_list.append(_point(data_type, point_time, point_time, values))
+    rng.shuffle(point_list)
+    return FitnessDataPoint(
+        dataSourceId=f"derived:com.google.{data_type}:com.google.android.gms:merged",
+        insertedDataPoint=point_list,
+        deletedDataPoint=[],
+        nextPageToken="",
+    )
+
+
+def make_sleep_segments(
+    nights: int,
+    segments_per_night: int,
+    seed: int = 0,
+    end_s: float | None = None,
+) -> FitnessObject:
+    """Return fragmented sleep stage segments over a number of nights."""
+    rng = random.Random(seed)
+    end_s = time.time() if end_s is None else end_s
+    stages = list(SLEEP_STAGE_WEIGHTS)
+    weights = list(SLEEP_STAGE_WEIGHTS.values())
+    point_list = []
+    for night in range(nights):
+        # Eight hours of sleep ending at the same time each day
+        night_end = end_s - night * DAY_SECONDS
+        segment = 8 * 60 * 60 / max(segments_per_night, 1)
+        night_start = night_end - segment * segments_per_night
+        for index in range(segments_per_night):
+            segment_start = night_start + index * segment
+            stage = rng.choices(stages, weights)[0]
+            point_list.append(
+                _point(
+                    "com.google.sleep.segment",
+                    segment_start,
+                    segment_start + segment,
+                    [{"intVal": stage, "mapVal": []}],
+                )
+            )
+    return FitnessObject(
+        dataSourceId="derived:com.google.sleep.segment:com.google.android.gms:merged",
+        minStartTimeNs="0",
+        maxEndTimeNs=str(int(end_s * NANOSECONDS_SECONDS_CONVERSION)),
+        point=point_list,
+    )
+
+
+def make_sessions(
+    sessions: int,
+    activity_type: int = 72,
+    seed: int = 0,
+    end_s: float | None = None,
+    spacing_s: float = DAY_SECONDS,
+    activity_types: tuple[int, ...] = (),
+) -> FitnessSessionResponse:
+    """Return a list of sessions of one activity type, sleep (72) by default.
+
+    Sessions end every spacing_s seconds, counting back from end_s. If
+    activity_types is given, sessions cycle through those activities instead.
+    """
+    rng = random.Random(seed)
+    end_ms = int((time.time() if end_s is None else end_s) * 1000)
+    session_list = []
+    for index in range(sessions):
+        session_end = end_ms - int(index * spacing_s * 1000)
+        session_start = session_end - rng.randint(20, 9 * 60) * 60 * 1000
+        session_list.append(
+            FitnessSession(
+                id=f"session-{index}",
+                name="Sleep",
+                description="",
+                activityType=(
+                    activity_types[index % len(activity_types)]
+                    if activity_types
+                    else activity_type
+                ),
+                startTimeMillis=str(session_start),
+                endTimeMillis=str(session_end),
+                modifiedTimeMillis=str(session_end),
+                activeTimeMillis=str(session_end - session_start),
+            )
+        )
+    return FitnessSessionResponse(
+        session=session_list,
+        deletedSession=None,
+        hasMoreData=None,
+        nextPageToken=None,
+    )
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+
 from aiohttp.client_exceptions import ClientError, ClientResponseError
 
 from homeassistant.config_entries import ConfigEntry
@@ -18,7 +20,23 @@ from homeassistant.helpers.device_registry import DeviceEntry
 from .coordinator import Coordinator
 
 from .api import AsyncConfigEntryAuth, LOGGER
-from .const import DOMAIN
+from .backfill import StatisticsBackfill, async_remove_progress
+from .const import (
+    CONF_BACKFILL_DAYS,
+    CONF_BACKGROUND_REFRESH,
+    CONF_PROMETHEUS_METRICS,
+    CONF_STARTUP_STAGGER,
+    DATA_METRICS_VIEW,
+    DEFAULT_BACKFILL_DAYS,
+    DEFAULT_BACKGROUND_REFRESH,
+    DEFAULT_PROMETHEUS_METRICS,
+    DEFAULT_STARTUP_STAGGER,
+    DOMAIN,
+)
+from .cache import FitDataCache
+from .discovery import async_get_discovery_cache
+from .scheduler import get_account_scheduler
+from .views import GoogleFitMetricsView
 
 PLATFORMS = [Platform.SENSOR]
 
@@ -32,7 +50,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     LOGGER.debug("Attempting to create OAuth2 session")
     session = OAuth2Session(hass, entry, implementation)
-    auth = AsyncConfigEntryAuth(async_get_clientsession(hass), session)
+    auth = AsyncConfigEntryAuth(
+        async_get_clientsession(hass),
+        session,
+        await async_get_discovery_cache(hass),
+        connections=get_account_scheduler(hass).connections,
+    )
     try:
         LOGGER.debug("Checking OAuth2 session is valid.")
         await auth.check_and_refresh_token()
@@ -47,6 +70,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     LOGGER.debug("Creating Google Fit data access coordinator.")
     coordinator = Coordinator(hass=hass, config=entry, auth=auth)
+    restored = await coordinator.async_restore()
+    # Find out which data sources exist before the sensors are created
+    await coordinator.async_discover_sources()
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "auth": auth,
@@ -54,17 +80,73 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     }
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    if entry.options.get(CONF_PROMETHEUS_METRICS, DEFAULT_PROMETHEUS_METRICS):
+        domain_data = hass.data[DOMAIN]
+        if not domain_data.get(DATA_METRICS_VIEW):
+            hass.http.register_view(GoogleFitMetricsView(hass))
+            domain_data[DATA_METRICS_VIEW] = True
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
     # Attempt to retrieve values immediately, not waiting for first
     # time interval to pass
-    LOGGER.debug("Requesting initial sensor value fetch.")
-    await coordinator.async_config_entry_first_refresh()
+    if entry.options.get(CONF_BACKGROUND_REFRESH, DEFAULT_BACKGROUND_REFRESH):
+        # Don't hold up Home Assistant start up. Sensors show their cached values,
+        # if any, until the first fetch completes.
+        delay = _get_startup_delay(hass, entry)
+        LOGGER.debug("Scheduling initial sensor value fetch in %u seconds.", delay)
+        entry.async_create_background_task(
+            hass,
+            _async_delayed_refresh(coordinator, delay),
+            f"{DOMAIN} initial refresh {entry.entry_id}",
+        )
+    else:
+        LOGGER.debug("Requesting initial sensor value fetch.")
+        if restored:
+            # Sensors already have their cached values, so a failed fetch is
+            # retried on the next update rather than failing setup
+            await coordinator.async_refresh()
+        else:
+            await coordinator.async_config_entry_first_refresh()
+
+    # Import history into long-term statistics without holding up set up
+    backfill_days = entry.options.get(CONF_BACKFILL_DAYS, DEFAULT_BACKFILL_DAYS)
+    if backfill_days:
+        if "recorder" in hass.config.components:
+            entry.async_create_background_task(
+                hass,
+                StatisticsBackfill(
+                    hass, entry, auth, coordinator, backfill_days
+                ).async_run(),
+                f"{DOMAIN} statistics backfill {entry.entry_id}",
+            )
+        else:
+            LOGGER.warning(
+                "Not importing Google Fit history as the recorder is not enabled"
+            )
 
     LOGGER.debug("Integration setup successful.")
     return True
 
 
+def _get_startup_delay(hass: HomeAssistant, entry: ConfigEntry) -> int:
+    """Return how long to wait before the first fetch for an entry.
+
+    Each account waits the startup stagger longer than the one before it, so
+    accounts do not all query Google at once.
+    """
+    stagger = entry.options.get(CONF_STARTUP_STAGGER, DEFAULT_STARTUP_STAGGER)
+    entry_ids = [other.entry_id for other in hass.config_entries.async_entries(DOMAIN)]
+    return entry_ids.index(entry.entry_id) * stagger
+
+
+async def _async_delayed_refresh(coordinator: Coordinator, delay: int) -> None:
+    """Refresh the coordinator after the given number of seconds."""
+    if delay:
+        await asyncio.sleep(delay)
+    LOGGER.debug("Requesting initial sensor value fetch.")
+    await coordinator.async_refresh()
+
+
 async def update_listener(hass, entry) -> None:
     """Handle options update."""
     await hass.config_entries.async_reload(entry.entry_id)
@@ -83,6 +165,12 @@ async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     await async_setup_entry(hass, entry)
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the data cached and the backfill progress of a removed entry."""
+    await FitDataCache(hass, entry.entry_id).async_remove()
+    await async_remove_progress(hass, entry.entry_id)
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 ) -> bool:
@@ -1,12 +1,17 @@
 """API for Google Fit bound to Home Assistant OAuth."""
 
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime
+import threading
+import time
 from aiohttp import ClientSession
 from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
 from google.oauth2.utils import OAuthClientAuthHandler
-from googleapiclient.discovery import build
-from googleapiclient.discovery_cache.base import Cache
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpRequest, build_http
 
 from homeassistant.core import HomeAssistant
 from homeassistant.const import CONF_ACCESS_TOKEN
@@ -15,6 +20,7 @@ from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from .api_types import (
     FitService,
+    FitnessAggregateResponse,
     FitnessData,
     FitnessObject,
     FitnessDataPoint,
@@ -24,7 +30,16 @@ from .api_types import (
     LastPointSensorDescription,
     SumSessionSensorDescription,
 )
-from .const import SLEEP_STAGE, LOGGER, NANOSECONDS_SECONDS_CONVERSION
+from .client import FitRestClient
+from .discovery import DiscoveryDocumentCache
+from .incremental import IncrementalSum, LatestPoint, SessionSync
+from .const import (
+    FIT_API_BASE_URL,
+    SLEEP_STAGE,
+    SLEEP_STAGE_KEYS,
+    LOGGER,
+    NANOSECONDS_SECONDS_CONVERSION,
+)
 
 
 class AsyncConfigEntryAuth(OAuthClientAuthHandler):
@@ -34,11 +49,26 @@ class AsyncConfigEntryAuth(OAuthClientAuthHandler):
         self,
         websession: ClientSession,
         oauth2Session: config_entry_oauth2_flow.OAuth2Session,
+        discovery_cache: DiscoveryDocumentCache,
+        base_url: str = FIT_API_BASE_URL,
+        connections: threading.local | None = None,
     ) -> None:
-        """Initialise Google Fit Auth."""
+        """Initialise Google Fit Auth.
+
+        base_url is only used by the aiohttp transport. The googleapiclient service
+        takes its endpoint from the discovery document. connections holds the HTTP
+        connection of each executor thread, and may be shared between accounts.
+        """
         LOGGER.debug("Initialising Google Fit Authentication Session")
         self.oauth_session = oauth2Session
-        self.discovery_cache = SimpleDiscoveryCache()
+        self.discovery_cache = discovery_cache
+        self.rest_client = FitRestClient(
+            websession, self.check_and_refresh_token, base_url
+        )
+        self.service_metrics = ServiceCacheMetrics()
+        self._service: FitService | None = None
+        self._credentials: Credentials | None = None
+        self._connections = connections or threading.local()
         super().__init__(websession)
 
     @property
@@ -53,10 +83,15 @@ class AsyncConfigEntryAuth(OAuthClientAuthHandler):
         return self.access_token
 
     async def get_resource(self, hass: HomeAssistant) -> FitService:
-        """Get current resource."""
+        """Get current resource.
+
+        The built service is cached and reused for as long as the access token is
+        unchanged. When the token is refreshed the cached service is re-credentialed
+        with the new token rather than being rebuilt.
+        """
 
         try:
-            credentials = Credentials(await self.check_and_refresh_token())
+            token = await self.check_and_refresh_token()
             LOGGER.debug("Successfully retrieved existing access credentials.")
         except RefreshError as ex:
             LOGGER.warning(
@@ -65,34 +100,130 @@ class AsyncConfigEntryAuth(OAuthClientAuthHandler):
             self.oauth_session.config_entry.async_start_reauth(self.oauth_session.hass)
             raise ex
 
+        if self._service is not None and self._credentials is not None:
+            if self._credentials.token != token:
+                LOGGER.debug(
+                    "Access token changed. Updating cached service credentials."
+                )
+                # Every connection the service hands out shares this credentials
+                # object, so they all pick up the new token
+                self._credentials.token = token
+                self.service_metrics.recredentials += 1
+            self.service_metrics.cache_hits += 1
+            LOGGER.debug(
+                "Reusing cached Fit service. Estimated %.2fs saved over %u refreshes.",
+                self.service_metrics.seconds_saved,
+                self.service_metrics.cache_hits,
+            )
+            return self._service
+
+        credentials = Credentials(token)
+        document = await self.discovery_cache.async_get_document()
+
         def get_fitness() -> FitService:
-            return build(
-                "fitness",
-                "v1",
+            return build_from_document(
+                document,
                 credentials=credentials,
-                cache=self.discovery_cache,
-                static_discovery=False,
+                requestBuilder=_thread_local_request_builder(
+                    credentials, self._connections
+                ),
             )
 
-        return await hass.async_add_executor_job(get_fitness)
+        start = time.monotonic()
+        service = await hass.async_add_executor_job(get_fitness)
+        self.service_metrics.builds += 1
+        self.service_metrics.build_seconds += time.monotonic() - start
+        LOGGER.debug(
+            "Built Fit service in %.2fs", self.service_metrics.average_build_seconds
+        )
+
+        self._service = service
+        self._credentials = credentials
+        return service
+
+
+@dataclass
+class ServiceCacheMetrics:
+    """Refresh time metrics for the cached Fit service."""
+
+    builds: int = 0
+    build_seconds: float = 0
+    cache_hits: int = 0
+    recredentials: int = 0
+
+    @property
+    def average_build_seconds(self) -> float:
+        """Return the average time taken to build the service."""
+        if self.builds == 0:
+            return 0
+        return self.build_seconds / self.builds
+
+    @property
+    def seconds_saved(self) -> float:
+        """Return the estimated refresh time saved by reusing the cached service."""
+        return self.cache_hits * self.average_build_seconds
+
+
+def _thread_local_request_builder(
+    credentials: Credentials, connections: threading.local
+) -> Callable[..., HttpRequest]:
+    """Return a request builder which gives each executor thread its own connection.
+
+    httplib2 connections are not thread safe, so requests that are executed
+    concurrently from different executor threads must not share one. Each thread
+    keeps its own connection in connections, so keep-alive still works between the
+    requests it executes, even for different accounts. Each account authorises the
+    connection with its own credentials.
+    """
+    local = threading.local()
+
+    def build_request(http, *args, **kwargs) -> HttpRequest:
+        _ = http
+        if getattr(connections, "http", None) is None:
+            connections.http = build_http()
+        if getattr(local, "http", None) is None:
+            local.http = AuthorizedHttp(credentials, http=connections.http)
+        return HttpRequest(local.http, *args, **kwargs)
+
+    return build_request
+
+
+def _is_later(time_nanos: str, other_nanos: str) -> bool:
+    """Return whether one nanosecond timestamp string is later than another.
+
+    Timestamps are unsigned integer strings without leading zeros, so they can be
+    ordered by length then lexically, without parsing every one to an int.
+    """
+    if len(time_nanos) != len(other_nanos):
+        return len(time_nanos) > len(other_nanos)
+    return time_nanos > other_nanos
 
 
-class SimpleDiscoveryCache(Cache):
-    """A very simple discovery cache."""
+def _format_seconds(timestamp: float) -> str:
+    """Return a timestamp in seconds as local time, for log and error messages.
 
-    def __init__(self) -> None:
-        """Cache Initialisation."""
-        self._data = {}
+    Only called when a message is actually produced, as formatting is far slower
+    than parsing the timestamp.
+    """
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
 
-    def get(self, url):
-        """Cache Getter (if available)."""
-        if url in self._data:
-            return self._data[url]
-        return None
 
-    def set(self, url, content) -> None:
-        """Cache Setter."""
-        self._data[url] = content
+def split_aggregate_response(
+    response: FitnessAggregateResponse, sources: tuple[str, ...]
+) -> dict[str, FitnessObject]:
+    """Return the aggregated points of each source in an aggregate response.
+
+    Every bucket holds one dataset per source, in the order the sources were
+    requested. The points of each source are returned as a dataset of that source,
+    so they can be parsed like a datasets.get response.
+    """
+    datasets: dict[str, FitnessObject] = {
+        source: FitnessObject(dataSourceId=source, point=[]) for source in sources
+    }
+    for bucket in response.get("bucket", []):
+        for source, dataset in zip(sources, bucket.get("dataset", []), strict=False):
+            datasets[source]["point"].extend(dataset.get("point", []))
+    return datasets
 
 
 class GoogleFitParse:
@@ -100,9 +231,27 @@ class GoogleFitParse:
 
     data: FitnessData
     unknown_sleep_warn: bool
+    _incremental_sums: dict[str, IncrementalSum] | None
+    _latest_points: dict[str, LatestPoint] | None
+    _session_sync: SessionSync | None
+    # The last session response totalled, with its total for each activity
+    _session_totals: tuple[FitnessSessionResponse, dict[int, float]] | None
 
-    def __init__(self):
-        """Initialise the data to base value and add a timestamp."""
+    def __init__(
+        self,
+        incremental_sums: dict[str, IncrementalSum] | None = None,
+        latest_points: dict[str, LatestPoint] | None = None,
+        session_sync: SessionSync | None = None,
+    ):
+        """Initialise the data to base value and add a timestamp.
+
+        If incremental_sums is given, summed sensors with a running sum for their
+        data key are updated from that sum instead of summing the response alone.
+        If latest_points is given, last point sensors may be parsed from a bounded
+        FitnessObject, with the last known value kept for that data key.
+        If session_sync is given, session responses are changes to apply to it, and
+        session sensors are totalled from the synced sessions.
+        """
         self.data = FitnessData(
             lastUpdate=datetime.now(),
             activeMinutes=None,
@@ -115,11 +264,11 @@ class GoogleFitParse:
             bodyFat=None,
             bodyTemperature=None,
             steps=None,
-            awakeSeconds=0,
-            sleepSeconds=0,
-            lightSleepSeconds=0,
-            deepSleepSeconds=0,
-            remSleepSeconds=0,
+            awakeSeconds=None,
+            sleepSeconds=None,
+            lightSleepSeconds=None,
+            deepSleepSeconds=None,
+            remSleepSeconds=None,
             heartRate=None,
             heartRateResting=None,
             bloodPressureSystolic=None,
@@ -129,21 +278,26 @@ class GoogleFitParse:
             oxygenSaturation=None,
         )
         self.unknown_sleep_warn = False
+        self._incremental_sums = incremental_sums
+        self._latest_points = latest_points
+        self._session_sync = session_sync
+        self._parsed_sleep: FitnessObject | None = None
+        self._session_totals = None
+        self.general_sleep_seconds = 0.0
 
     def _sum_points_int(self, response: FitnessObject) -> int:
         """Get the most recent integer point value.
 
         If no data points exist, return 0.
         """
-        counter = 0
-        found_value = False
-        for point in response.get("point"):
-            value = point.get("value")[0].get("intVal")
-            if value is not None:
-                found_value = True
-                counter += value
-
-        if not found_value:
+        values = [
+            value
+            for point in response.get("point")
+            if (value := point["value"][0].get("intVal")) is not None
+        ]
+        counter = sum(values)
+
+        if not values:
             LOGGER.debug(
                 "No int data points found for %s", response.get("dataSourceId")
             )
@@ -155,15 +309,14 @@ class GoogleFitParse:
 
         If no data points exist, return 0.
         """
-        counter = 0
-        found_value = False
-        for point in response.get("point"):
-            value = point.get("value")[0].get("fpVal")
-            if value is not None:
-                found_value = True
-                counter += value
-
-        if not found_value:
+        values = [
+            value
+            for point in response.get("point")
+            if (value := point["value"][0].get("fpVal")) is not None
+        ]
+        counter = sum(values)
+
+        if not values:
             LOGGER.debug(
                 "No float data points found for %s", response.get("dataSourceId")
             )
@@ -179,16 +332,19 @@ class GoogleFitParse:
         """
         value = None
         data_points = response.get("insertedDataPoint")
-        latest_time = 0
+        latest_time = ""
         for point in data_points:
-            if int(point.get("endTimeNanos")) > latest_time:
-                values = point.get("value")
-                if len(values) > 0:
+            end_time = point["endTimeNanos"]
+            if _is_later(end_time, latest_time):
+                values = point["value"]
+                if len(values) > index:
                     data_point = values[index].get("fpVal")
                     if data_point is not None:
                         # Update the latest found time and update the value
-                        latest_time = int(point.get("endTimeNanos"))
-                        value = round(data_point, 2)
+                        latest_time = end_time
+                        value = data_point
+        if value is not None:
+            value = round(value, 2)
         if value is None:
             LOGGER.debug(
                 "No float data points found for %s", response.get("dataSourceId")
@@ -204,15 +360,17 @@ class GoogleFitParse:
         """
         value = None
         data_points = response.get("insertedDataPoint")
-        latest_time = 0
+        latest_time = ""
         for point in data_points:
-            if int(point.get("endTimeNanos")) > latest_time:
-                values = point.get("value")
-                if len(values) > 0:
-                    value = values[index].get("intVal")
-                    if value is not None:
+            end_time = point["endTimeNanos"]
+            if _is_later(end_time, latest_time):
+                values = point["value"]
+                if len(values) > index:
+                    data_point = values[index].get("intVal")
+                    if data_point is not None:
                         # Update the latest found time and update the value
-                        latest_time = int(point.get("endTimeNanos"))
+                        latest_time = end_time
+                        value = data_point
         if value is None:
             LOGGER.debug(
                 "No int data points found for %s", response.get("dataSourceId")
@@ -220,6 +378,16 @@ class GoogleFitParse:
         return value
 
     def _parse_sleep(self, response: FitnessObject) -> None:
+        """Parse sleep segments into the total time spent in each sleep stage.
+
+        Every sleep stage sensor is updated from the same response, so a response is
+        only parsed once. Time in the general sleep stage is added to total sleep.
+        """
+        if response is self._parsed_sleep:
+            return
+        self._parsed_sleep = response
+
+        stage_seconds: dict[str, float] = {}
         data_points = response.get("point")
 
         for point in data_points:
@@ -233,13 +401,7 @@ class GoogleFitParse:
             ):
                 sleep_stage = SLEEP_STAGE.get(sleep_type)
                 start_time = int(start_time_ns) / NANOSECONDS_SECONDS_CONVERSION
-                start_time_str = datetime.fromtimestamp(start_time).strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
                 end_time = int(end_time_ns) / NANOSECONDS_SECONDS_CONVERSION
-                end_time_str = datetime.fromtimestamp(end_time).strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
 
                 if sleep_stage == "Out-of-bed":
                     LOGGER.debug("Out of bed sleep sensor not supported. Ignoring.")
@@ -249,17 +411,19 @@ class GoogleFitParse:
                         "for sleep stage between %s and %s. Please report this as a bug to the "
                         "original data provider. This will not be reported in "
                         "Home Assistant.",
-                        start_time_str,
-                        end_time_str,
+                        _format_seconds(start_time),
+                        _format_seconds(end_time),
                     )
                 elif sleep_stage is not None:
                     if end_time >= start_time:
-                        self.data[sleep_stage] += end_time - start_time
+                        stage_seconds[sleep_stage] = (
+                            stage_seconds.get(sleep_stage, 0) + end_time - start_time
+                        )
                     else:
                         raise UpdateFailed(
                             "Invalid data from Google. End time "
-                            f"({end_time_str}) is less than the start time "
-                            f"({start_time_str})."
+                            f"({_format_seconds(end_time)}) is less than the start "
+                            f"time ({_format_seconds(start_time)})."
                         )
                 else:
                     raise UpdateFailed(
@@ -273,6 +437,20 @@ class GoogleFitParse:
                     "End Time (ns): {end_time}"
                 )
 
+        for sleep_stage in SLEEP_STAGE_KEYS:
+            self.data[sleep_stage] = stage_seconds.get(sleep_stage, 0)
+        self.add_general_sleep(stage_seconds.get("sleepSeconds", 0))
+
+    def add_general_sleep(self, seconds: float) -> None:
+        """Add time in the general sleep stage to total sleep.
+
+        Sleep segments and sessions may be parsed in either order, so the time is
+        added to total sleep now if it has been parsed, or else once it is.
+        """
+        self.general_sleep_seconds = seconds
+        if self.data["sleepSeconds"] is not None:
+            self.data["sleepSeconds"] += seconds
+
     def _parse_object(
         self, entity: SumPointsSensorDescription, response: FitnessObject
     ) -> None:
@@ -280,31 +458,66 @@ class GoogleFitParse:
         # Sleep data needs to be handled separately
         if entity.is_sleep:
             self._parse_sleep(response)
+        elif (
+            self._incremental_sums is not None
+            and entity.data_key in self._incremental_sums
+        ):
+            self.data[entity.data_key] = self._incremental_sums[entity.data_key].update(
+                response, entity.is_int
+            )
         else:
             if entity.is_int:
                 self.data[entity.data_key] = self._sum_points_int(response)
             else:
                 self.data[entity.data_key] = self._sum_points_float(response)
 
-    def _parse_session(
+    def _total_sessions(
         self, entity: SumSessionSensorDescription, response: FitnessSessionResponse
-    ) -> None:
-        """Parse the given session data from the API according to the passed request_id."""
-        # Sum all the session times (in milliseconds) from within the response
-        summed_millis: int = 0
+    ) -> dict[int, float]:
+        """Return the total duration of the sessions of each activity in seconds."""
+        if self._session_sync is not None:
+            self._session_sync.update(response)
+            return self._session_sync.total_seconds()
+
         sessions = response.get("session")
         if sessions is None:
             raise UpdateFailed(
                 f"Google Fit returned invalid session data for source: {entity.source}.\r"
                 "Session data is None."
             )
+        # Sum all the session times (in milliseconds) for each activity
+        summed_millis: dict[int, int] = {}
         for session in sessions:
-            summed_millis += int(session.get("endTimeMillis")) - int(
-                session.get("startTimeMillis")
+            activity_type = int(session.get("activityType", 0))
+            summed_millis[activity_type] = (
+                summed_millis.get(activity_type, 0)
+                + int(session.get("endTimeMillis"))
+                - int(session.get("startTimeMillis"))
             )
-
         # Time is in milliseconds, need to convert to seconds
-        self.data[entity.data_key] = summed_millis / 1000
+        return {
+            activity_type: millis / 1000
+            for activity_type, millis in summed_millis.items()
+        }
+
+    def _parse_session(
+        self, entity: SumSessionSensorDescription, response: FitnessSessionResponse
+    ) -> None:
+        """Parse the given session data from the API according to the passed request_id.
+
+        Sessions are totalled per activity once for each response, however many
+        sensors share it.
+        """
+        if self._session_totals is None or self._session_totals[0] is not response:
+            self._session_totals = (response, self._total_sessions(entity, response))
+        totals = self._session_totals[1]
+        if self._session_sync is None and not entity.list_all_activities:
+            # The response only lists sessions of this sensor's activity
+            self.data[entity.data_key] = sum(totals.values())
+        else:
+            self.data[entity.data_key] = totals.get(entity.activity_id, 0)
+        if entity.data_key == "sleepSeconds":
+            self.data["sleepSeconds"] += self.general_sleep_seconds
 
     def _parse_point(
         self, entity: LastPointSensorDescription, response: FitnessDataPoint
@@ -341,6 +554,14 @@ class GoogleFitParse:
         elif isinstance(entity, LastPointSensorDescription):
             if fit_point is not None:
                 self._parse_point(entity, fit_point)
+            elif (
+                fit_object is not None
+                and self._latest_points is not None
+                and entity.data_key in self._latest_points
+            ):
+                self.data[entity.data_key] = self._latest_points[
+                    entity.data_key
+                ].update(fit_object, entity.is_int, entity.index)
             else:
                 raise UpdateFailed(
                     "Bad Google Fit parse call. "
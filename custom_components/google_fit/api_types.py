@@ -3,7 +3,7 @@
 from datetime import datetime, timedelta
 from typing import TypedDict, Any
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from homeassistant.components.sensor import SensorEntityDescription
 from googleapiclient.discovery import Resource
 from googleapiclient.http import BatchHttpRequest
@@ -144,12 +144,83 @@ class FitnessSessionResponse(TypedDict):
     https://googleapis.github.io/google-api-python-client/docs/dyn/fitness_v1.users.sessions.html#list
     """
 
-    deletedSession: None
-    hasMoreData: None
+    deletedSession: list[FitnessSession] | None
+    hasMoreData: bool | None
     nextPageToken: str | None
     session: list[FitnessSession]
 
 
+class FitnessBucket(TypedDict):
+    """Representation of a single time bucket of aggregated data.
+
+    See:
+    https://googleapis.github.io/google-api-python-client/docs/dyn/fitness_v1.users.dataset.html#aggregate
+    """
+
+    startTimeMillis: str
+    endTimeMillis: str
+    dataset: list[FitnessObject]
+
+
+class FitnessAggregateResponse(TypedDict):
+    """Representation of an aggregate response returned from the Google Fit API.
+
+    See:
+    https://googleapis.github.io/google-api-python-client/docs/dyn/fitness_v1.users.dataset.html#aggregate
+    """
+
+    bucket: list[FitnessBucket]
+
+
+FitResponse = (
+    FitnessObject | FitnessDataPoint | FitnessSessionResponse | FitnessAggregateResponse
+)
+
+
+@dataclass(frozen=True)
+class FitRequest:
+    """A single Google Fit API call.
+
+    Requests are hashable so sensors that need an identical call can share it.
+    """
+
+    # The API method, e.g. "datasets.get"
+    endpoint: str
+    source: str
+    # Query and path parameters other than userId and dataSourceId
+    params: tuple[tuple[str, Any], ...] = ()
+    # Every data source fetched by a request which spans several, in which case
+    # source only labels the request
+    shared_sources: tuple[str, ...] = ()
+
+    @property
+    def sources(self) -> tuple[str, ...]:
+        """Return every data source the request fetches."""
+        return self.shared_sources or (self.source,)
+
+    def with_page_token(self, page_token: str) -> "FitRequest":
+        """Return the request for the page with the given token."""
+        return replace(
+            self,
+            params=(
+                *((key, value) for key, value in self.params if key != "pageToken"),
+                ("pageToken", page_token),
+            ),
+        )
+
+
+@dataclass
+class FitResults:
+    """Outcome of making a set of API requests."""
+
+    # Requests which succeeded, with their responses
+    responses: list[tuple[FitRequest, FitResponse]] = field(default_factory=list)
+    # Requests which failed, with their errors
+    errors: list[tuple[FitRequest, Exception]] = field(default_factory=list)
+    # Size in bytes of the body of each response, where known
+    response_bytes: dict[FitRequest, int] = field(default_factory=dict)
+
+
 @dataclass
 class GoogleFitSensorDescription(SensorEntityDescription):
     """Extends Sensor Description types to add necessary component values."""
@@ -160,6 +231,14 @@ class GoogleFitSensorDescription(SensorEntityDescription):
     infrequent_update: bool = False
 
 
+@dataclass
+class DiagnosticSensorDescription(SensorEntityDescription):
+    """Represents a sensor showing one of the coordinator's API metrics."""
+
+    # Name of the FitMetrics attribute to show
+    metric: str = "undefined"
+
+
 @dataclass
 class SumPointsSensorDescription(GoogleFitSensorDescription):
     """Represents a sensor where the values are summed over a set time period."""
@@ -190,3 +269,7 @@ class SumSessionSensorDescription(GoogleFitSensorDescription):
 
     # The period over which to sum
     period: timedelta = timedelta(days=1)
+
+    # If true, sessions of every activity are listed by one request shared with
+    # the other sensors of the same source, and only this activity is summed
+    list_all_activities: bool = False
@@ -0,0 +1,348 @@
+"""Import of historical Google Fit data into long-term statistics."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+import re
+from typing import Any, TypedDict, TypeVar
+
+from aiohttp.client_exceptions import ClientError, ClientResponseError
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import AsyncConfigEntryAuth, split_aggregate_response
+from .api_types import (
+    FitnessPoint,
+    GoogleFitSensorDescription,
+    LastPointSensorDescription,
+    SumPointsSensorDescription,
+)
+from .const import (
+    BACKFILL_MEASUREMENT_CHUNK_DAYS,
+    BACKFILL_PAGE_POINTS,
+    BACKFILL_RUN_DELAY_SECONDS,
+    BACKFILL_STORAGE_KEY,
+    BACKFILL_STORAGE_VERSION,
+    BACKFILL_SUM_CHUNK_DAYS,
+    DOMAIN,
+    LOGGER,
+    NANOSECONDS_SECONDS_CONVERSION,
+)
+from .coordinator import Coordinator
+from .ratelimit import TRANSIENT_ERRORS, get_retry_wait, is_retryable
+
+_T = TypeVar("_T")
+
+
+class BackfillState(TypedDict):
+    """Progress of the backfill of one account, as saved to disk.
+
+    Times are timestamps in seconds. Everything before sums_until and
+    measurements_until has been imported.
+    """
+
+    start: float
+    sums_until: float
+    measurements_until: float
+    # Running total of each summed sensor, up to sums_until
+    sums: dict[str, float]
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store[BackfillState]:
+    """Return the store holding the backfill progress of a config entry."""
+    return Store(hass, BACKFILL_STORAGE_VERSION, f"{BACKFILL_STORAGE_KEY}.{entry_id}")
+
+
+async def async_remove_progress(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the backfill progress of a removed config entry."""
+    await _get_store(hass, entry_id).async_remove()
+
+
+def _get_value(entity: GoogleFitSensorDescription, point: FitnessPoint) -> float | None:
+    """Return the value of a data point for a sensor, or None if it has none."""
+    index = getattr(entity, "index", 0)
+    values = point["value"]
+    if len(values) <= index:
+        return None
+    return values[index].get("intVal" if entity.is_int else "fpVal")
+
+
+class StatisticsBackfill:
+    """Imports the history of an account into Home Assistant's long-term statistics.
+
+    Daily totals of summed sensors come from the aggregate endpoint, and the hourly
+    mean, minimum and maximum of measurements from datasets.get. Both are written
+    as external statistics, so the history does not depend on the recorder having
+    seen each sensor. Time is walked oldest first in chunks, and only one chunk is
+    held at a time, with measurements reduced to hourly figures as each page
+    arrives. Progress, including the running total of each sum, is saved once each
+    chunk is written, so an interrupted backfill carries on from the last chunk.
+    API calls count against the account's quotas like any other.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        auth: AsyncConfigEntryAuth,
+        coordinator: Coordinator,
+        days: int,
+    ) -> None:
+        """Initialise a backfill of the given number of days before today."""
+        self._hass = hass
+        self._entry = entry
+        self._client = auth.rest_client
+        self._coordinator = coordinator
+        self._days = days
+        self._store = _get_store(hass, entry.entry_id)
+        self._sums = [
+            entity
+            for entity in coordinator.entity_descriptions
+            if isinstance(entity, SumPointsSensorDescription)
+            and not entity.is_sleep
+            and entity.period_seconds == 0
+        ]
+        self._measurements: dict[str, list[LastPointSensorDescription]] = {}
+        for entity in coordinator.entity_descriptions:
+            if isinstance(entity, LastPointSensorDescription):
+                self._measurements.setdefault(entity.source, []).append(entity)
+
+    async def async_run(self) -> None:
+        """Import every completed day, then carry on after each midnight.
+
+        A failed import, for whatever reason, is tried again on the next run from
+        where it stopped.
+        """
+        while True:
+            try:
+                await self._async_import()
+            except (ClientError, TimeoutError) as err:
+                LOGGER.warning("Unable to import Google Fit history: %s", err)
+            except Exception:
+                # Keep the task alive, so the import is tried again next time
+                LOGGER.exception("Unexpected error importing Google Fit history")
+            next_run = dt_util.start_of_local_day() + timedelta(
+                days=1, seconds=BACKFILL_RUN_DELAY_SECONDS
+            )
+            await asyncio.sleep((next_run - dt_util.now()).total_seconds())
+
+    def _get_statistic_id(self, entity: GoogleFitSensorDescription) -> str:
+        """Return the ID of the external statistic for a sensor of this account."""
+        data_key = re.sub(r"(?<!^)(?=[A-Z])", "_", entity.data_key).lower()
+        return f"{DOMAIN}:{self._entry.entry_id.lower()}_{data_key}"
+
+    def _get_metadata(
+        self, entity: GoogleFitSensorDescription, has_sum: bool
+    ) -> StatisticMetaData:
+        """Return the metadata of the external statistic for a sensor."""
+        return StatisticMetaData(
+            has_mean=not has_sum,
+            has_sum=has_sum,
+            name=f"{self._entry.title} {entity.name}",
+            source=DOMAIN,
+            statistic_id=self._get_statistic_id(entity),
+            unit_of_measurement=entity.native_unit_of_measurement,
+        )
+
+    async def _async_call(
+        self, call: Callable[..., Awaitable[_T]], *args: Any, **kwargs: Any
+    ) -> _T:
+        """Make an API call within the account's quotas, retrying where possible."""
+        attempt = 0
+        while True:
+            await self._coordinator.async_acquire_quota()
+            try:
+                return await call(*args, **kwargs)
+            except (ClientResponseError, *TRANSIENT_ERRORS) as err:
+                delay = get_retry_wait((err,), attempt) if is_retryable(err) else None
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _async_import(self) -> None:
+        """Import every day completed since the last import."""
+        end = dt_util.start_of_local_day()
+        start = end - timedelta(days=self._days)
+        state = await self._store.async_load()
+        if state is None or state["start"] > start.timestamp():
+            # Nothing imported yet, or more history has been asked for since
+            state = BackfillState(
+                start=start.timestamp(),
+                sums_until=start.timestamp(),
+                measurements_until=start.timestamp(),
+                sums={},
+            )
+
+        sums = [
+            entity
+            for entity in self._sums
+            if self._coordinator.is_source_available(entity.source)
+        ]
+        chunk_start = dt_util.as_local(dt_util.utc_from_timestamp(state["sums_until"]))
+        while sums and chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=BACKFILL_SUM_CHUNK_DAYS), end)
+            await self._async_import_sums(state, sums, chunk_start, chunk_end)
+            state["sums_until"] = chunk_end.timestamp()
+            await self._store.async_save(state)
+            chunk_start = chunk_end
+
+        measurements = {
+            source: entities
+            for source, entities in self._measurements.items()
+            if self._coordinator.is_source_available(source)
+        }
+        chunk_start = dt_util.as_local(
+            dt_util.utc_from_timestamp(state["measurements_until"])
+        )
+        while measurements and chunk_start < end:
+            chunk_end = min(
+                chunk_start + timedelta(days=BACKFILL_MEASUREMENT_CHUNK_DAYS), end
+            )
+            for source, entities in measurements.items():
+                await self._async_import_measurements(
+                    source, entities, chunk_start, chunk_end
+                )
+            state["measurements_until"] = chunk_end.timestamp()
+            await self._store.async_save(state)
+            chunk_start = chunk_end
+
+        LOGGER.debug(
+            "Imported Google Fit history up to %s for %s", end, self._entry.title
+        )
+
+    async def _async_import_sums(
+        self,
+        state: BackfillState,
+        entities: list[SumPointsSensorDescription],
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        """Import the daily totals of summed sensors between two local midnights.
+
+        Google buckets the totals by local day, so days stay aligned across daylight
+        saving changes. The running total of each sensor in state is advanced.
+        """
+        sources = tuple(dict.fromkeys(entity.source for entity in entities))
+        start_millis = int(start.timestamp() * 1000)
+        end_millis = int(end.timestamp() * 1000)
+        response, _ = await self._async_call(
+            self._client.aggregate,
+            {
+                "aggregateBy": [{"dataSourceId": source} for source in sources],
+                "bucketByTime": {
+                    "period": {
+                        "type": "day",
+                        "value": 1,
+                        "timeZoneId": str(dt_util.DEFAULT_TIME_ZONE),
+                    },
+                },
+                "startTimeMillis": start_millis,
+                "endTimeMillis": end_millis,
+            },
+        )
+
+        statistics: dict[str, list[StatisticData]] = {
+            entity.data_key: [] for entity in entities
+        }
+        for bucket in response.get("bucket", []):
+            bucket_start = dt_util.as_local(
+                dt_util.utc_from_timestamp(int(bucket["startTimeMillis"]) / 1000)
+            )
+            datasets = split_aggregate_response({"bucket": [bucket]}, sources)
+            for entity in entities:
+                total = sum(
+                    value
+                    for point in datasets[entity.source].get("point", [])
+                    if (value := _get_value(entity, point)) is not None
+                )
+                state["sums"][entity.data_key] = (
+                    state["sums"].get(entity.data_key, 0) + total
+                )
+                statistics[entity.data_key].append(
+                    StatisticData(
+                        start=bucket_start,
+                        state=total,
+                        sum=state["sums"][entity.data_key],
+                    )
+                )
+
+        for entity in entities:
+            if statistics[entity.data_key]:
+                async_add_external_statistics(
+                    self._hass,
+                    self._get_metadata(entity, has_sum=True),
+                    statistics[entity.data_key],
+                )
+
+    async def _async_import_measurements(
+        self,
+        source: str,
+        entities: list[LastPointSensorDescription],
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        """Import the hourly mean, minimum and maximum of measurements of a source.
+
+        Points are requested a page at a time, and each is folded into the count,
+        total, minimum and maximum of the hour it ended in.
+        """
+        millis = NANOSECONDS_SECONDS_CONVERSION // 1000
+        dataset_id = (
+            f"{int(start.timestamp() * 1000) * millis}"
+            + f"-{int(end.timestamp() * 1000) * millis}"
+        )
+        hour_ns = 60 * 60 * NANOSECONDS_SECONDS_CONVERSION
+        hours: dict[str, dict[int, list[float]]] = {
+            entity.data_key: {} for entity in entities
+        }
+        page_token: str | None = None
+        while True:
+            response, _ = await self._async_call(
+                self._client.get_dataset,
+                source,
+                dataset_id,
+                limit=BACKFILL_PAGE_POINTS,
+                page_token=page_token,
+            )
+            for point in response.get("point", []):
+                hour = int(point["endTimeNanos"]) // hour_ns
+                for entity in entities:
+                    if (value := _get_value(entity, point)) is None:
+                        continue
+                    figures = hours[entity.data_key].get(hour)
+                    if figures is None:
+                        hours[entity.data_key][hour] = [1, value, value, value]
+                    else:
+                        figures[0] += 1
+                        figures[1] += value
+                        figures[2] = min(figures[2], value)
+                        figures[3] = max(figures[3], value)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        for entity in entities:
+            if not hours[entity.data_key]:
+                continue
+            async_add_external_statistics(
+                self._hass,
+                self._get_metadata(entity, has_sum=False),
+                [
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(hour * 60 * 60),
+                        mean=total / count,
+                        min=minimum,
+                        max=maximum,
+                    )
+                    for hour, (count, total, minimum, maximum) in sorted(
+                        hours[entity.data_key].items()
+                    )
+                ],
+            )
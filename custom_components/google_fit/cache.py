@@ -0,0 +1,66 @@
+"""Persistent cache of fetched Google Fit data, kept across restarts."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import time
+from typing import Any, TypedDict
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CACHE_MAX_AGE_SECONDS,
+    CACHE_SAVE_DELAY,
+    CACHE_STORAGE_KEY,
+    CACHE_STORAGE_VERSION,
+    LOGGER,
+)
+
+
+class CachedState(TypedDict):
+    """Everything known about one account, as held in the cache."""
+
+    saved: float
+    data: dict[str, Any]
+    incremental_sums: dict[str, dict[str, Any]]
+    latest_points: dict[str, dict[str, Any]]
+    session_sync: dict[str, Any] | None
+    schedule: dict[str, dict[str, Any]]
+    available_sources: list[str] | None
+
+
+class FitDataCache:
+    """Last known sensor values and fetch state of a config entry, saved to disk.
+
+    Saves are delayed and coalesced, so frequent updates cost at most one write per
+    save delay. Home Assistant writes any pending save when it shuts down. A cache
+    older than the maximum age is ignored, as fetching from scratch is then cheaper
+    than catching up.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialise the cache for a config entry."""
+        self._store: Store[CachedState] = Store(
+            hass, CACHE_STORAGE_VERSION, f"{CACHE_STORAGE_KEY}.{entry_id}"
+        )
+
+    async def async_load(self) -> CachedState | None:
+        """Return the cached state, or None if there is none or it is too old."""
+        state = await self._store.async_load()
+        if state is None:
+            return None
+        age = time.time() - state["saved"]
+        if age > CACHE_MAX_AGE_SECONDS:
+            LOGGER.debug("Ignoring Google Fit data cached %u seconds ago", age)
+            return None
+        LOGGER.debug("Loaded Google Fit data cached %u seconds ago", age)
+        return state
+
+    def async_schedule_save(self, data_func: Callable[[], CachedState]) -> None:
+        """Save the state returned by data_func after the save delay."""
+        self._store.async_delay_save(data_func, CACHE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the cache from disk."""
+        await self._store.async_remove()
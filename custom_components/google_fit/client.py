@@ -0,0 +1,142 @@
+"""Asynchronous REST client for the Google Fit API."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+from urllib.parse import quote
+
+from aiohttp import ClientSession
+
+from homeassistant.util.json import json_loads
+
+from .api_types import (
+    FitnessAggregateResponse,
+    FitnessDataPoint,
+    FitnessDataSource,
+    FitnessObject,
+    FitnessSessionResponse,
+)
+from .const import FIT_API_BASE_URL, LOGGER
+
+
+class FitRestClient:
+    """Minimal Google Fit REST client built directly on an aiohttp session.
+
+    Unlike the googleapiclient service this needs no discovery document and never
+    blocks an executor thread. Connections are pooled and kept alive by the shared
+    aiohttp session.
+    """
+
+    def __init__(
+        self,
+        websession: ClientSession,
+        get_access_token: Callable[[], Awaitable[str]],
+        base_url: str = FIT_API_BASE_URL,
+    ) -> None:
+        """Initialise the client.
+
+        get_access_token is awaited before every request and must return a valid
+        OAuth access token.
+        """
+        self._websession = websession
+        self._get_access_token = get_access_token
+        self._base_url = base_url.rstrip("/")
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+    ) -> tuple[Any, int]:
+        """Make a request to the Fit API.
+
+        Returns the decoded JSON response and the size in bytes of its body, which
+        is returned rather than stored so concurrent requests cannot mix them up.
+        Raises aiohttp.ClientResponseError for any non-2xx response.
+        """
+        token = await self._get_access_token()
+        url = f"{self._base_url}/{path}"
+        LOGGER.debug("%s %s", method, url)
+        async with self._websession.request(
+            method,
+            url,
+            params={
+                key: str(value)
+                for key, value in (params or {}).items()
+                if value is not None
+            },
+            json=json,
+            headers={"Authorization": f"Bearer {token}"},
+            raise_for_status=True,
+        ) as response:
+            body = await response.read()
+            return json_loads(body), len(body)
+
+    async def get_dataset(
+        self,
+        source: str,
+        dataset_id: str,
+        limit: int | None = None,
+        page_token: str | None = None,
+    ) -> tuple[FitnessObject, int]:
+        """Return data points for a source within the dataset time range.
+
+        dataset_id is of the form '<start nanos>-<end nanos>'. If limit is given,
+        only that many of the most recent points are returned. The size in bytes
+        of the response is returned alongside it.
+        """
+        return await self._request(
+            "GET",
+            f"users/me/dataSources/{quote(source, safe='')}/datasets/{dataset_id}",
+            params={"limit": limit, "pageToken": page_token},
+        )
+
+    async def list_data_point_changes(
+        self,
+        source: str,
+        limit: int | None = None,
+        page_token: str | None = None,
+    ) -> tuple[FitnessDataPoint, int]:
+        """Return inserted and deleted data points for a source, and the size."""
+        return await self._request(
+            "GET",
+            f"users/me/dataSources/{quote(source, safe='')}/dataPointChanges",
+            params={"limit": limit, "pageToken": page_token},
+        )
+
+    async def list_sessions(
+        self,
+        start_time: str | None = None,
+        end_time: str | None = None,
+        activity_type: int | None = None,
+        page_token: str | None = None,
+        include_deleted: bool = False,
+    ) -> tuple[FitnessSessionResponse, int]:
+        """Return sessions between the RFC3339 start and end times, and the size."""
+        return await self._request(
+            "GET",
+            "users/me/sessions",
+            params={
+                "startTime": start_time,
+                "endTime": end_time,
+                "activityType": activity_type,
+                "pageToken": page_token,
+                "includeDeleted": "true" if include_deleted else None,
+            },
+        )
+
+    async def aggregate(
+        self, body: dict[str, Any]
+    ) -> tuple[FitnessAggregateResponse, int]:
+        """Return data from several sources, aggregated by Google into time buckets.
+
+        body is an AggregateRequest, as documented for users.dataset.aggregate. The
+        size in bytes of the response is returned alongside it.
+        """
+        return await self._request("POST", "users/me/dataset:aggregate", json=body)
+
+    async def list_data_sources(self) -> tuple[FitnessDataSource, int]:
+        """Return all data sources visible to the account, and the size."""
+        return await self._request("GET", "users/me/dataSources")
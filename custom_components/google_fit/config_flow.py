@@ -8,7 +8,7 @@ from typing import Any
 import voluptuous as vol
 
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError as GoogleApiError
 
 from homeassistant import config_entries
@@ -22,9 +22,42 @@ from .const import (
     DEFAULT_ACCESS,
     DOMAIN,
     CONF_INFREQUENT_INTERVAL_MULTIPLIER,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_API_TRANSPORT,
+    CONF_INCREMENTAL_FETCH,
+    CONF_BOUNDED_LATEST_POINT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_SOURCE_DISCOVERY,
+    CONF_RESTART_CACHE,
+    CONF_BACKGROUND_REFRESH,
+    CONF_STARTUP_STAGGER,
+    CONF_PROMETHEUS_METRICS,
+    CONF_AGGREGATE_SUMS,
+    CONF_SLEEP_SESSIONS,
+    CONF_INCREMENTAL_SESSIONS,
+    CONF_ACTIVITY_SESSIONS,
+    CONF_BACKFILL_DAYS,
     DEFAULT_SCAN_INTERVAL,
     DEFAULT_INFREQUENT_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_API_TRANSPORT,
+    DEFAULT_INCREMENTAL_FETCH,
+    DEFAULT_BOUNDED_LATEST_POINT,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_SOURCE_DISCOVERY,
+    DEFAULT_RESTART_CACHE,
+    DEFAULT_BACKGROUND_REFRESH,
+    DEFAULT_STARTUP_STAGGER,
+    DEFAULT_PROMETHEUS_METRICS,
+    DEFAULT_AGGREGATE_SUMS,
+    DEFAULT_SLEEP_SESSIONS,
+    DEFAULT_INCREMENTAL_SESSIONS,
+    DEFAULT_ACTIVITY_SESSIONS,
+    DEFAULT_BACKFILL_DAYS,
+    ACTIVITY_TYPES,
+    API_TRANSPORTS,
 )
+from .discovery import async_get_discovery_cache
 
 
 class OAuth2FlowHandler(
@@ -85,6 +118,8 @@ class OAuth2FlowHandler(
             "Creating new authentication."
         )
         credentials = Credentials(data[CONF_TOKEN][CONF_ACCESS_TOKEN])
+        discovery_cache = await async_get_discovery_cache(self.hass)
+        fitness_document = await discovery_cache.async_get_document()
 
         def _get_profile() -> dict[str, Any]:
             """Get profile from inside the executor."""
@@ -93,12 +128,7 @@ class OAuth2FlowHandler(
             return user_info
 
         def _check_fit_access() -> FitService:
-            lib = build(
-                "fitness",
-                "v1",
-                credentials=credentials,
-                static_discovery=False,
-            )
+            lib = build_from_document(fitness_document, credentials=credentials)
             self.logger.debug(
                 "Checking Google Fit access with client id: %s", credentials.client_id
             )
@@ -165,6 +195,116 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             DEFAULT_INFREQUENT_INTERVAL,
                         ),
                     ): config_validation.positive_int,
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_REQUESTS,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_CONCURRENT_REQUESTS,
+                            DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        ),
+                    ): config_validation.positive_int,
+                    vol.Required(
+                        CONF_API_TRANSPORT,
+                        default=self.config_entry.options.get(
+                            CONF_API_TRANSPORT,
+                            DEFAULT_API_TRANSPORT,
+                        ),
+                    ): vol.In(API_TRANSPORTS),
+                    vol.Required(
+                        CONF_INCREMENTAL_FETCH,
+                        default=self.config_entry.options.get(
+                            CONF_INCREMENTAL_FETCH,
+                            DEFAULT_INCREMENTAL_FETCH,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_BOUNDED_LATEST_POINT,
+                        default=self.config_entry.options.get(
+                            CONF_BOUNDED_LATEST_POINT,
+                            DEFAULT_BOUNDED_LATEST_POINT,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_ADAPTIVE_POLLING,
+                        default=self.config_entry.options.get(
+                            CONF_ADAPTIVE_POLLING,
+                            DEFAULT_ADAPTIVE_POLLING,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_SOURCE_DISCOVERY,
+                        default=self.config_entry.options.get(
+                            CONF_SOURCE_DISCOVERY,
+                            DEFAULT_SOURCE_DISCOVERY,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_RESTART_CACHE,
+                        default=self.config_entry.options.get(
+                            CONF_RESTART_CACHE,
+                            DEFAULT_RESTART_CACHE,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_BACKGROUND_REFRESH,
+                        default=self.config_entry.options.get(
+                            CONF_BACKGROUND_REFRESH,
+                            DEFAULT_BACKGROUND_REFRESH,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_STARTUP_STAGGER,
+                        default=self.config_entry.options.get(
+                            CONF_STARTUP_STAGGER,
+                            DEFAULT_STARTUP_STAGGER,
+                        ),
+                    ): config_validation.positive_int,
+                    vol.Required(
+                        CONF_PROMETHEUS_METRICS,
+                        default=self.config_entry.options.get(
+                            CONF_PROMETHEUS_METRICS,
+                            DEFAULT_PROMETHEUS_METRICS,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_AGGREGATE_SUMS,
+                        default=self.config_entry.options.get(
+                            CONF_AGGREGATE_SUMS,
+                            DEFAULT_AGGREGATE_SUMS,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_SLEEP_SESSIONS,
+                        default=self.config_entry.options.get(
+                            CONF_SLEEP_SESSIONS,
+                            DEFAULT_SLEEP_SESSIONS,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_INCREMENTAL_SESSIONS,
+                        default=self.config_entry.options.get(
+                            CONF_INCREMENTAL_SESSIONS,
+                            DEFAULT_INCREMENTAL_SESSIONS,
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_ACTIVITY_SESSIONS,
+                        default=self.config_entry.options.get(
+                            CONF_ACTIVITY_SESSIONS,
+                            DEFAULT_ACTIVITY_SESSIONS,
+                        ),
+                    ): config_validation.multi_select(
+                        {
+                            str(activity_id): name
+                            for activity_id, (name, _) in ACTIVITY_TYPES.items()
+                        }
+                    ),
+                    vol.Required(
+                        CONF_BACKFILL_DAYS,
+                        default=self.config_entry.options.get(
+                            CONF_BACKFILL_DAYS,
+                            DEFAULT_BACKFILL_DAYS,
+                        ),
+                    ): config_validation.positive_int,
                 }
             ),
         )
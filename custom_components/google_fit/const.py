@@ -8,6 +8,8 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
 )
 from homeassistant.const import (
+    EntityCategory,
+    UnitOfInformation,
     UnitOfTime,
     UnitOfLength,
     UnitOfMass,
@@ -18,6 +20,7 @@ from homeassistant.const import (
 )
 
 from .api_types import (
+    DiagnosticSensorDescription,
     SumPointsSensorDescription,
     LastPointSensorDescription,
     SumSessionSensorDescription,
@@ -32,10 +35,151 @@ MANUFACTURER: Final = "Google, Inc."
 
 # Configuration schema
 CONF_INFREQUENT_INTERVAL_MULTIPLIER: Final = "infrequent_interval"
+CONF_MAX_CONCURRENT_REQUESTS: Final = "max_concurrent_requests"
+CONF_API_TRANSPORT: Final = "api_transport"
+CONF_INCREMENTAL_FETCH: Final = "incremental_fetch"
+CONF_BOUNDED_LATEST_POINT: Final = "bounded_latest_point"
+CONF_ADAPTIVE_POLLING: Final = "adaptive_polling"
+CONF_SOURCE_DISCOVERY: Final = "source_discovery"
+CONF_RESTART_CACHE: Final = "restart_cache"
+CONF_BACKGROUND_REFRESH: Final = "background_refresh"
+CONF_STARTUP_STAGGER: Final = "startup_stagger"
+CONF_PROMETHEUS_METRICS: Final = "prometheus_metrics"
+CONF_AGGREGATE_SUMS: Final = "aggregate_sums"
+CONF_SLEEP_SESSIONS: Final = "sleep_sessions"
+CONF_INCREMENTAL_SESSIONS: Final = "incremental_sessions"
+CONF_ACTIVITY_SESSIONS: Final = "activity_sessions"
+CONF_BACKFILL_DAYS: Final = "backfill_days"
+
+# API transport options
+TRANSPORT_INDIVIDUAL: Final = "individual"
+TRANSPORT_BATCH: Final = "batch"
+TRANSPORT_AIOHTTP: Final = "aiohttp"
+API_TRANSPORTS: Final = [TRANSPORT_INDIVIDUAL, TRANSPORT_BATCH, TRANSPORT_AIOHTTP]
 
 # Default Configuration Values
 DEFAULT_SCAN_INTERVAL: Final = 5
 DEFAULT_INFREQUENT_INTERVAL: Final = 12
+DEFAULT_MAX_CONCURRENT_REQUESTS: Final = 4
+DEFAULT_API_TRANSPORT: Final = TRANSPORT_INDIVIDUAL
+DEFAULT_INCREMENTAL_FETCH: Final = False
+DEFAULT_BOUNDED_LATEST_POINT: Final = False
+DEFAULT_ADAPTIVE_POLLING: Final = False
+DEFAULT_SOURCE_DISCOVERY: Final = False
+DEFAULT_RESTART_CACHE: Final = False
+DEFAULT_BACKGROUND_REFRESH: Final = False
+DEFAULT_STARTUP_STAGGER: Final = 0
+DEFAULT_PROMETHEUS_METRICS: Final = False
+DEFAULT_AGGREGATE_SUMS: Final = False
+DEFAULT_SLEEP_SESSIONS: Final = False
+DEFAULT_INCREMENTAL_SESSIONS: Final = False
+DEFAULT_ACTIVITY_SESSIONS: Final[list[str]] = []
+DEFAULT_BACKFILL_DAYS: Final = 0
+
+# Maximum time (in seconds) a single coordinator refresh may take. Any requests still
+# outstanding after this are abandoned, but results already received are kept.
+UPDATE_TIMEOUT: Final = 30
+
+# Google Fit API methods used to fetch sensor data
+ENDPOINT_DATASETS_GET: Final = "datasets.get"
+ENDPOINT_DATA_POINT_CHANGES_LIST: Final = "dataPointChanges.list"
+ENDPOINT_SESSIONS_LIST: Final = "sessions.list"
+ENDPOINT_DATASET_AGGREGATE: Final = "dataset.aggregate"
+# Stand in for the data source of requests which span several sources
+AGGREGATE_SOURCE: Final = "aggregate"
+SESSION_SYNC_SOURCE: Final = "sessions"
+
+# Root of the Google Fit REST API
+FIT_API_BASE_URL: Final = "https://fitness.googleapis.com/fitness/v1"
+
+# Incremental fetching. Points ending up to this many seconds before the last seen
+# point are re-requested to catch late writes, and the whole window is re-fetched
+# at least this often to catch very late ones.
+INCREMENTAL_OVERLAP_SECONDS: Final = 15 * 60
+INCREMENTAL_FULL_REFRESH_SECONDS: Final = 60 * 60
+
+# Bounded latest point fetching. Only this many of the most recent points are
+# requested, looking back at most this far.
+LATEST_POINT_LIMIT: Final = 5
+LATEST_POINT_LOOKBACK_SECONDS: Final = 60 * 60 * 24 * 365 * 10
+LATEST_POINT_FULL_REFRESH_SECONDS: Final = 60 * 60 * 24
+
+# Incremental session sync. Sessions are counted if they ended within the window,
+# and every session is listed again at least this often to drop any missed change.
+SESSION_SYNC_WINDOW_SECONDS: Final = 60 * 60 * 24
+SESSION_SYNC_FULL_REFRESH_SECONDS: Final = 60 * 60 * 24
+
+# Polling scheduler. Sources due within the grace period are queried early rather
+# than waking up again moments later. Adaptive polling multiplies the interval of an
+# unchanged source by the backoff factor each time, up to the update interval times
+# the infrequent multiplier (or the infrequent maximum for infrequent sensors).
+SCHEDULER_GRACE_SECONDS: Final = 10
+SCHEDULER_BACKOFF_FACTOR: Final = 1.5
+SCHEDULER_CADENCE_SMOOTHING: Final = 0.3
+SCHEDULER_MAX_INFREQUENT_INTERVAL_SECONDS: Final = 60 * 60 * 6
+SCHEDULER_MIN_WAKE_SECONDS: Final = 30
+
+# A data source which fails this many times in a row makes its sensors unavailable,
+# until it is next queried successfully
+SOURCE_MAX_ERRORS: Final = 3
+
+# Maximum number of API calls in flight at once, across every account
+GLOBAL_MAX_CONCURRENT_REQUESTS: Final = 16
+
+# Google Fit API quotas. Each account has its own per user quota, and every account
+# shares the quota of the OAuth client's project. Calls are allowed in bursts of up
+# to the given size, as long as the average stays within the quota.
+RATE_LIMIT_USER_PER_MINUTE: Final = 300
+RATE_LIMIT_USER_BURST: Final = 100
+RATE_LIMIT_PROJECT_PER_DAY: Final = 86400
+RATE_LIMIT_PROJECT_BURST: Final = 1000
+
+# Rate limited and failed API calls are retried, backing off exponentially from the
+# base delay up to the maximum delay, unless the server says how long to wait
+RETRY_MAX_ATTEMPTS: Final = 4
+RETRY_BASE_DELAY_SECONDS: Final = 1
+RETRY_MAX_DELAY_SECONDS: Final = 30
+
+# How often to re-check which data sources exist in the account
+SOURCE_DISCOVERY_INTERVAL_SECONDS: Final = 60 * 60 * 6
+
+# Discovery document cache
+DISCOVERY_URL: Final = (
+    "https://{api}.googleapis.com/$discovery/rest?version={apiVersion}"
+)
+DISCOVERY_STORAGE_KEY: Final = f"{DOMAIN}.discovery"
+DISCOVERY_STORAGE_VERSION: Final = 1
+DISCOVERY_CACHE_TTL: Final = 60 * 60 * 24
+DISCOVERY_CACHE_MAX_ENTRIES: Final = 8
+
+# Per config entry cache of fetched data, kept across restarts. Saved at most this
+# often, and discarded on load if older than the maximum age.
+CACHE_STORAGE_KEY: Final = f"{DOMAIN}.cache"
+CACHE_STORAGE_VERSION: Final = 1
+CACHE_SAVE_DELAY: Final = 60
+CACHE_MAX_AGE_SECONDS: Final = 60 * 60 * 24
+
+# Long-term statistics backfill. Daily totals are fetched this many days per
+# aggregate request, and measurements this many days per chunk, in pages of at most
+# this many points. Each run imports every day completed since the last one, and
+# runs again this long after the next midnight.
+BACKFILL_STORAGE_KEY: Final = f"{DOMAIN}.backfill"
+BACKFILL_STORAGE_VERSION: Final = 1
+BACKFILL_SUM_CHUNK_DAYS: Final = 30
+BACKFILL_MEASUREMENT_CHUNK_DAYS: Final = 7
+BACKFILL_PAGE_POINTS: Final = 1000
+BACKFILL_RUN_DELAY_SECONDS: Final = 60 * 60
+
+# Keys for data shared between all config entries in hass.data[DOMAIN]
+DATA_DISCOVERY_CACHE: Final = "discovery_cache"
+DATA_ACCOUNT_SCHEDULER: Final = "account_scheduler"
+DATA_METRICS_VIEW: Final = "metrics_view"
+
+# Where API metrics are served in the Prometheus text format, if enabled
+METRICS_URL: Final = f"/api/{DOMAIN}/metrics"
+
+# Maximum number of calls Google allows in a single batch request
+MAX_BATCH_REQUESTS: Final = 1000
 
 # Useful constants
 NANOSECONDS_SECONDS_CONVERSION: Final = 1000000000
@@ -67,6 +211,44 @@ SLEEP_STAGE: Final = {
     6: "remSleepSeconds",
 }
 
+# Google Fit activity type of sleep sessions
+SLEEP_ACTIVITY_ID: Final = 72
+
+# Activities which can have a session sensor, with their name and icon. Taken from:
+# https://developers.google.com/fit/rest/v1/reference/activity-types
+ACTIVITY_TYPES: Final = {
+    1: ("Biking", "mdi:bike"),
+    7: ("Walking", "mdi:walk"),
+    8: ("Running", "mdi:run"),
+    12: ("Basketball", "mdi:basketball"),
+    24: ("Dancing", "mdi:dance-ballroom"),
+    29: ("Football", "mdi:soccer"),
+    32: ("Golf", "mdi:golf"),
+    35: ("Hiking", "mdi:hiking"),
+    45: ("Meditation", "mdi:meditation"),
+    54: ("Rowing Machine", "mdi:rowing"),
+    65: ("Skiing", "mdi:ski"),
+    77: ("Stair Climbing", "mdi:stairs"),
+    80: ("Strength Training", "mdi:weight-lifter"),
+    82: ("Swimming", "mdi:swim"),
+    87: ("Tennis", "mdi:tennis"),
+    100: ("Yoga", "mdi:yoga"),
+}
+
+# Data source of activity sessions. Sessions of every activity are listed together.
+ACTIVITY_SOURCE: Final = (
+    "derived:com.google.activity.segment:com.google.android.gms:merge_activity_segments"
+)
+
+# Sleep stages reported by the sleep segment sensors. Time in the general sleep
+# stage is added to the total sleep of the sleep session sensor.
+SLEEP_STAGE_KEYS: Final = (
+    "awakeSeconds",
+    "lightSleepSeconds",
+    "deepSleepSeconds",
+    "remSleepSeconds",
+)
+
 
 ENTITY_DESCRIPTIONS = (
     SumPointsSensorDescription(
@@ -197,7 +379,7 @@ ENTITY_DESCRIPTIONS = (
         device_class=SensorDeviceClass.DURATION,
         source="derived:com.google.sleep.segment:com.google.android.gms:merged",
         data_key="sleepSeconds",
-        activity_id=72,
+        activity_id=SLEEP_ACTIVITY_ID,
     ),
     SumPointsSensorDescription(
         key="google_fit",
@@ -309,3 +491,71 @@ ENTITY_DESCRIPTIONS = (
         data_key="oxygenSaturation",
     ),
 )
+
+# Session sensors for each activity, which are only created if chosen in the options
+ACTIVITY_DESCRIPTIONS = tuple(
+    SumSessionSensorDescription(
+        key="google_fit",
+        name=f"{name} Time",
+        icon=icon,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.DURATION,
+        source=ACTIVITY_SOURCE,
+        data_key=f"activity{activity_id}Seconds",
+        activity_id=activity_id,
+        list_all_activities=True,
+    )
+    for activity_id, (name, icon) in ACTIVITY_TYPES.items()
+)
+
+DIAGNOSTIC_DESCRIPTIONS = (
+    DiagnosticSensorDescription(
+        key="api_requests",
+        name="API Requests",
+        icon="mdi:api",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        metric="requests",
+    ),
+    DiagnosticSensorDescription(
+        key="api_errors",
+        name="API Errors",
+        icon="mdi:alert-circle",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        metric="errors",
+    ),
+    DiagnosticSensorDescription(
+        key="api_retries",
+        name="API Retries",
+        icon="mdi:refresh",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        metric="retries",
+    ),
+    DiagnosticSensorDescription(
+        key="api_data_received",
+        name="API Data Received",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        metric="response_bytes",
+    ),
+    DiagnosticSensorDescription(
+        key="last_refresh_duration",
+        name="Last Refresh Duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        suggested_display_precision=2,
+        metric="last_refresh_seconds",
+    ),
+)
@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
-from datetime import timedelta, datetime
+import asyncio
+from collections.abc import Callable
+from datetime import UTC, timedelta, datetime
+import time
+from typing import Any
 import async_timeout
-from googleapiclient.http import HttpError
+from aiohttp.client_exceptions import ClientError, ClientResponseError
+from googleapiclient.http import HttpError, HttpRequest
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.core import HomeAssistant
@@ -15,37 +20,148 @@ from homeassistant.helpers.update_coordinator import (
 from homeassistant.helpers.config_entry_oauth2_flow import OAuth2Session
 from homeassistant.const import CONF_SCAN_INTERVAL
 
-from .api import AsyncConfigEntryAuth, GoogleFitParse
+from .api import AsyncConfigEntryAuth, GoogleFitParse, split_aggregate_response
+from .cache import CachedState, FitDataCache
 from .api_types import (
+    FitRequest,
+    FitResponse,
+    FitResults,
+    FitService,
     FitnessData,
     FitnessObject,
-    FitnessDataPoint,
     FitnessSessionResponse,
     GoogleFitSensorDescription,
     SumPointsSensorDescription,
     LastPointSensorDescription,
     SumSessionSensorDescription,
 )
+from .incremental import IncrementalSum, LatestPoint, SessionSpan, SessionSync
+from .metrics import FitMetrics, count_items
+from .ratelimit import (
+    TRANSIENT_ERRORS,
+    TokenBucket,
+    get_error_status,
+    get_retry_wait,
+    is_retryable,
+)
+from .scheduler import (
+    AccountScheduler,
+    SensorScheduler,
+    get_account_scheduler,
+    get_last_modified_millis,
+)
 from .const import (
     CONF_INFREQUENT_INTERVAL_MULTIPLIER,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_API_TRANSPORT,
+    CONF_INCREMENTAL_FETCH,
+    CONF_BOUNDED_LATEST_POINT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_SOURCE_DISCOVERY,
+    CONF_RESTART_CACHE,
+    CONF_AGGREGATE_SUMS,
+    CONF_SLEEP_SESSIONS,
+    CONF_INCREMENTAL_SESSIONS,
+    CONF_ACTIVITY_SESSIONS,
     DEFAULT_INFREQUENT_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_API_TRANSPORT,
+    DEFAULT_INCREMENTAL_FETCH,
+    DEFAULT_BOUNDED_LATEST_POINT,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_SOURCE_DISCOVERY,
+    DEFAULT_RESTART_CACHE,
+    DEFAULT_AGGREGATE_SUMS,
+    DEFAULT_SLEEP_SESSIONS,
+    DEFAULT_INCREMENTAL_SESSIONS,
+    DEFAULT_ACTIVITY_SESSIONS,
+    ACTIVITY_DESCRIPTIONS,
+    AGGREGATE_SOURCE,
     DOMAIN,
+    ENDPOINT_DATA_POINT_CHANGES_LIST,
+    ENDPOINT_DATASET_AGGREGATE,
+    ENDPOINT_DATASETS_GET,
+    ENDPOINT_SESSIONS_LIST,
     LOGGER,
     ENTITY_DESCRIPTIONS,
     DEFAULT_SCAN_INTERVAL,
+    LATEST_POINT_LIMIT,
+    MAX_BATCH_REQUESTS,
     NANOSECONDS_SECONDS_CONVERSION,
+    RATE_LIMIT_USER_BURST,
+    RATE_LIMIT_USER_PER_MINUTE,
+    RETRY_MAX_ATTEMPTS,
+    SCHEDULER_MIN_WAKE_SECONDS,
+    SESSION_SYNC_SOURCE,
+    SLEEP_ACTIVITY_ID,
+    SLEEP_STAGE_KEYS,
+    SOURCE_DISCOVERY_INTERVAL_SECONDS,
+    TRANSPORT_AIOHTTP,
+    TRANSPORT_BATCH,
+    UPDATE_TIMEOUT,
 )
 
 
+def _merge_session_pages(
+    response: FitnessSessionResponse, page: FitnessSessionResponse
+) -> FitnessSessionResponse:
+    """Return a session list with the sessions of its next page added.
+
+    The page token and whether there is more data are taken from the next page.
+    """
+    return FitnessSessionResponse(
+        session=[*(response.get("session") or []), *(page.get("session") or [])],
+        deletedSession=[
+            *(response.get("deletedSession") or []),
+            *(page.get("deletedSession") or []),
+        ],
+        hasMoreData=page.get("hasMoreData"),
+        nextPageToken=page.get("nextPageToken"),
+    )
+
+
+def _run_timed(
+    submitted: float,
+    fetch: Callable[[FitService | None, list[FitRequest]], FitResults],
+    service: FitService | None,
+    requests: list[FitRequest],
+) -> tuple[float, FitResults]:
+    """Run a blocking fetch and return how long it waited for an executor thread.
+
+    submitted is the monotonic time the fetch was handed to the executor.
+    """
+    return time.monotonic() - submitted, fetch(service, requests)
+
+
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
 class Coordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
 
     _auth: AsyncConfigEntryAuth
     _config: ConfigEntry
+    entity_descriptions: tuple[GoogleFitSensorDescription, ...]
     fitness_data: FitnessData | None = None
-    sensor_update_counter: int
     _infrequent_interval_multiplier: int
+    _max_concurrent_requests: int
+    _api_transport: str
+    _aggregate_sums: bool
+    _sleep_sessions: bool
+    _sleep_stages: tuple[FitRequest, int] | None
+    _general_sleep_seconds: float
+    _incremental_sums: dict[str, IncrementalSum]
+    _latest_points: dict[str, LatestPoint]
+    _session_sync: SessionSync | None
+    _scheduler: SensorScheduler
+    _poll_interval_seconds: int
+    _account_scheduler: AccountScheduler
+    _user_quota: TokenBucket
+    metrics: FitMetrics
+    _source_discovery: bool
+    _sources_discovered_at: float
+    _request_time: datetime
+    _cache: FitDataCache | None
+    _last_known: dict[str, Any]
+    available_sources: set[str] | None
 
     def __init__(
         self,
@@ -56,11 +172,96 @@ class Coordinator(DataUpdateCoordinator):
         """Initialise."""
         self._auth = auth
         self._config = config
-        self.sensor_update_counter = 0
         self._infrequent_interval_multiplier = config.options.get(
             CONF_INFREQUENT_INTERVAL_MULTIPLIER, DEFAULT_INFREQUENT_INTERVAL
         )
+        self._max_concurrent_requests = config.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        self._api_transport = config.options.get(
+            CONF_API_TRANSPORT, DEFAULT_API_TRANSPORT
+        )
+        # Every sensor of the account, including the activity session sensors
+        # chosen in the options
+        activity_ids = {
+            int(activity_id)
+            for activity_id in config.options.get(
+                CONF_ACTIVITY_SESSIONS, DEFAULT_ACTIVITY_SESSIONS
+            )
+        }
+        self.entity_descriptions = ENTITY_DESCRIPTIONS + tuple(
+            entity
+            for entity in ACTIVITY_DESCRIPTIONS
+            if entity.activity_id in activity_ids
+        )
+        # Whether summed sensors are totalled by Google with the aggregate endpoint
+        self._aggregate_sums = config.options.get(
+            CONF_AGGREGATE_SUMS, DEFAULT_AGGREGATE_SUMS
+        )
+        # Whether sleep stages are only fetched within the bounds of sleep sessions,
+        # and the last stage request made that way with the modification time of
+        # the sessions it was made for, along with its time in the general sleep
+        # stage
+        self._sleep_sessions = config.options.get(
+            CONF_SLEEP_SESSIONS, DEFAULT_SLEEP_SESSIONS
+        )
+        self._sleep_stages = None
+        self._general_sleep_seconds = 0.0
+        # Running sums for summed sensors, if they are being fetched incrementally.
+        # Sleep sensors are always fetched in full as they are parsed per stage.
+        # Aggregated sums need no running sum, as Google returns the total.
+        self._incremental_sums = {}
+        if (
+            config.options.get(CONF_INCREMENTAL_FETCH, DEFAULT_INCREMENTAL_FETCH)
+            and not self._aggregate_sums
+        ):
+            self._incremental_sums = {
+                entity.data_key: IncrementalSum(entity.period_seconds)
+                for entity in self.entity_descriptions
+                if isinstance(entity, SumPointsSensorDescription)
+                and not entity.is_sleep
+            }
+        # Last known values for last point sensors, if they are fetched with a
+        # bounded request instead of the full data point change history
+        self._latest_points = {}
+        if config.options.get(CONF_BOUNDED_LATEST_POINT, DEFAULT_BOUNDED_LATEST_POINT):
+            self._latest_points = {
+                entity.data_key: LatestPoint()
+                for entity in self.entity_descriptions
+                if isinstance(entity, LastPointSensorDescription)
+            }
+        # Sessions of every activity, if they are kept in sync incrementally
+        self._session_sync = None
+        if config.options.get(CONF_INCREMENTAL_SESSIONS, DEFAULT_INCREMENTAL_SESSIONS):
+            self._session_sync = SessionSync()
+        # Data sources which exist in the account, or None if not known
+        self._source_discovery = config.options.get(
+            CONF_SOURCE_DISCOVERY, DEFAULT_SOURCE_DISCOVERY
+        )
+        self._sources_discovered_at = 0
+        self.available_sources = None
+        self._request_time = datetime.today()
+        # Last good value of every sensor, kept on disk if the cache is enabled
+        self._cache = None
+        if config.options.get(CONF_RESTART_CACHE, DEFAULT_RESTART_CACHE):
+            self._cache = FitDataCache(hass, config.entry_id)
+        self._last_known = {}
         update_time = config.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        # Not _update_interval_seconds, which DataUpdateCoordinator sets whenever
+        # update_interval changes
+        self._poll_interval_seconds = update_time * 60
+        self._account_scheduler = get_account_scheduler(hass)
+        config.async_on_unload(self._account_scheduler.register(config.entry_id))
+        self._user_quota = TokenBucket(
+            RATE_LIMIT_USER_PER_MINUTE / 60, RATE_LIMIT_USER_BURST
+        )
+        self.metrics = FitMetrics()
+        self._scheduler = SensorScheduler(
+            self.entity_descriptions,
+            update_time * 60,
+            self._infrequent_interval_multiplier,
+            config.options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING),
+        )
         LOGGER.debug(
             "Setting up Google Fit Coordinator. Querying every %u minutes"
             + " (every %u minutes for less frequently used sensors).",
@@ -91,28 +292,821 @@ class Coordinator(DataUpdateCoordinator):
         """Return the config option on what factor the interval should be for infrequent sensors."""
         return self._infrequent_interval_multiplier
 
+    def is_source_available(self, source: str) -> bool:
+        """Return whether the account has the given data source.
+
+        All sources are considered available until discovery has succeeded.
+        """
+        return self.available_sources is None or source in self.available_sources
+
+    async def async_acquire_quota(self, calls: int = 1) -> None:
+        """Wait until the user and project quotas allow the given number of calls."""
+        await self._user_quota.async_acquire(calls)
+        await self._account_scheduler.project_quota.async_acquire(calls)
+
+    def get_source_status(self) -> dict[str, dict[str, Any]]:
+        """Return the polling schedule and health of each data source."""
+        return self._scheduler.get_status()
+
+    def is_source_failing(self, source: str) -> bool:
+        """Return whether the given source has failed too many times in a row."""
+        return self._scheduler.is_failing(source)
+
+    async def async_discover_sources(self) -> None:
+        """List the data sources in the account, if discovery is enabled and due.
+
+        On failure the previously discovered sources are kept.
+        """
+        if not self._source_discovery or (
+            time.monotonic() - self._sources_discovered_at
+            < SOURCE_DISCOVERY_INTERVAL_SECONDS
+            and self.available_sources is not None
+        ):
+            return
+
+        try:
+            response, _ = await self._auth.rest_client.list_data_sources()
+        except (ClientError, TimeoutError) as err:
+            LOGGER.warning("Unable to list Google Fit data sources: %s", err)
+            return
+
+        sources = {
+            source.get("dataStreamId") for source in response.get("dataSource", [])
+        }
+        if self.available_sources is not None:
+            for source in sources - self.available_sources:
+                LOGGER.info("Found new Google Fit data source: %s", source)
+        else:
+            LOGGER.debug(
+                "Skipping data sources missing from account: %s",
+                ", ".join(
+                    {
+                        entity.source
+                        for entity in self.entity_descriptions
+                        if entity.source not in sources
+                    }
+                ),
+            )
+        self.available_sources = sources
+        self._sources_discovered_at = time.monotonic()
+
+    async def async_restore(self) -> bool:
+        """Restore the last known data from the cache, if it is enabled.
+
+        Returns whether any data was restored.
+        """
+        if self._cache is None or (state := await self._cache.async_load()) is None:
+            return False
+
+        for data_key, saved in state["incremental_sums"].items():
+            if data_key in self._incremental_sums:
+                self._incremental_sums[data_key].restore(saved)
+        for data_key, saved in state["latest_points"].items():
+            if data_key in self._latest_points:
+                self._latest_points[data_key].restore(saved)
+        if self._session_sync is not None and state.get("session_sync"):
+            self._session_sync.restore(state["session_sync"])
+        self._scheduler.restore(state["schedule"])
+        if self._source_discovery and state["available_sources"] is not None:
+            self.available_sources = set(state["available_sources"])
+            self._sources_discovered_at = time.monotonic() - (
+                time.time() - state["saved"]
+            )
+
+        self._last_known = state["data"]
+        parser = GoogleFitParse()
+        data_keys = {entity.data_key for entity in self.entity_descriptions}
+        for data_key, value in self._last_known.items():
+            if data_key in data_keys:
+                parser.data[data_key] = value
+        parser.data["lastUpdate"] = datetime.fromtimestamp(state["saved"])
+        self.fitness_data = parser.data
+        self.data = self.fitness_data
+        LOGGER.debug("Restored %u cached sensor values", len(self._last_known))
+        return True
+
+    def _get_cached_state(self) -> CachedState:
+        """Return the state to save to the cache."""
+        return CachedState(
+            saved=time.time(),
+            data=self._last_known,
+            incremental_sums={
+                data_key: incremental_sum.as_dict()
+                for data_key, incremental_sum in self._incremental_sums.items()
+            },
+            latest_points={
+                data_key: latest_point.as_dict()
+                for data_key, latest_point in self._latest_points.items()
+            },
+            session_sync=(
+                self._session_sync.as_dict() if self._session_sync is not None else None
+            ),
+            schedule=self._scheduler.as_dict(),
+            available_sources=(
+                sorted(self.available_sources)
+                if self.available_sources is not None
+                else None
+            ),
+        )
+
     def _get_interval(self, interval_period: int = 0) -> str:
         """Return the necessary interval for API queries, with start and end time in nanoseconds.
 
         If midnight_reset is true, start time is considered to be midnight of that day.
         If false, start time is considered to be exactly 24 hours ago.
         """
+        # All requests in one update share an end time, so identical ones match
+        today = self._request_time
         start = 0
         if interval_period == 0:
             start = (
-                int(
-                    datetime.combine(
-                        datetime.today().date(), datetime.min.time()
-                    ).timestamp()
-                )
+                int(datetime.combine(today.date(), datetime.min.time()).timestamp())
                 * NANOSECONDS_SECONDS_CONVERSION
             )
         else:
-            start = int(datetime.today().timestamp()) - interval_period
+            start = int(today.timestamp()) - interval_period
             start = start * NANOSECONDS_SECONDS_CONVERSION
-        now = int(datetime.today().timestamp() * NANOSECONDS_SECONDS_CONVERSION)
+        now = int(today.timestamp() * NANOSECONDS_SECONDS_CONVERSION)
         return f"{start}-{now}"
 
+    def _get_dataset_id(self, entity: SumPointsSensorDescription) -> str:
+        """Return the dataset ID to request for a summed sensor on this update."""
+        if entity.data_key in self._incremental_sums:
+            return self._incremental_sums[entity.data_key].get_dataset_id(
+                self._request_time
+            )
+        return self._get_interval(entity.period_seconds)
+
+    def _get_session_window(self) -> tuple[str, str]:
+        """Return the start and end time for session queries as RFC3339 strings.
+
+        Sessions are requested if their end time was in the last 24 hours.
+        """
+        # All requests in one update share an end time, so identical ones match
+        now = datetime.fromtimestamp(self._request_time.timestamp(), UTC).replace(
+            tzinfo=None
+        )
+        end_time = now.isoformat() + "Z"
+        start_time = (now - timedelta(days=1)).isoformat() + "Z"
+        return start_time, end_time
+
+    def _get_session_request(
+        self, source: str, activity_id: int | None = None
+    ) -> FitRequest:
+        """Return the API request for sessions in the session window.
+
+        Sessions are filtered to the given activity, or if it is None, sessions of
+        every activity are listed.
+        """
+        start_time, end_time = self._get_session_window()
+        params: tuple[tuple[str, Any], ...] = (
+            ("startTime", start_time),
+            ("endTime", end_time),
+        )
+        if activity_id is not None:
+            params = (("activityType", activity_id), *params)
+        return FitRequest(ENDPOINT_SESSIONS_LIST, source, params)
+
+    def _get_sync_request(
+        self, session_sync: SessionSync, entities: list[GoogleFitSensorDescription]
+    ) -> FitRequest:
+        """Return the one request for session changes shared by every session sensor.
+
+        Sessions of every activity are listed, so the request fetches each of the
+        sensors' data sources.
+        """
+        return FitRequest(
+            ENDPOINT_SESSIONS_LIST,
+            SESSION_SYNC_SOURCE,
+            session_sync.get_params(self._request_time),
+            tuple(dict.fromkeys(entity.source for entity in entities)),
+        )
+
+    def _is_session(self, entity: GoogleFitSensorDescription) -> bool:
+        """Return whether a sensor is updated from a session list."""
+        return isinstance(
+            entity, SumSessionSensorDescription
+        ) or self._is_session_bounded(entity)
+
+    def _is_session_bounded(self, entity: GoogleFitSensorDescription) -> bool:
+        """Return whether a sensor is only fetched within sleep session bounds."""
+        return (
+            self._sleep_sessions
+            and isinstance(entity, SumPointsSensorDescription)
+            and entity.is_sleep
+        )
+
+    def _get_sleep_stage_request(
+        self,
+        parser: GoogleFitParse,
+        request: FitRequest,
+        entities: list[GoogleFitSensorDescription],
+        response: FitResponse,
+    ) -> tuple[FitRequest, int] | None:
+        """Return the sleep stage request needed after a sleep session response.
+
+        Stages are requested from the start of the first session to the end of the
+        last one, rather than for the whole day. If there were no sessions the
+        stages are all zero, and if the sessions are unchanged since their stages
+        were last fetched the last known values are kept. Either way no request is
+        needed. Returns the request and the modification time of the sessions.
+        """
+        stages = [entity for entity in entities if self._is_session_bounded(entity)]
+        if request.endpoint != ENDPOINT_SESSIONS_LIST or not stages:
+            return None
+        if self._session_sync is not None:
+            self._session_sync.update(response)
+            sessions = self._session_sync.get_sessions(SLEEP_ACTIVITY_ID)
+        else:
+            sessions = [
+                SessionSpan(
+                    SLEEP_ACTIVITY_ID,
+                    int(session["startTimeMillis"]),
+                    int(session["endTimeMillis"]),
+                    int(session.get("modifiedTimeMillis", 0)),
+                )
+                for session in response.get("session") or []
+            ]
+        source = stages[0].source
+        if not sessions:
+            parser.parse(
+                stages[0], fit_object=FitnessObject(dataSourceId=source, point=[])
+            )
+            return None
+
+        millis = NANOSECONDS_SECONDS_CONVERSION // 1000
+        start_ns = min(session.start_millis for session in sessions) * millis
+        end_ns = max(session.end_millis for session in sessions) * millis
+        stage_request = FitRequest(
+            ENDPOINT_DATASETS_GET,
+            source,
+            (("datasetId", f"{start_ns}-{end_ns}"),),
+        )
+        modified = max(session.modified_millis for session in sessions)
+        if self._sleep_stages == (stage_request, modified):
+            for sleep_stage in SLEEP_STAGE_KEYS:
+                parser.fit_data[sleep_stage] = self._last_known.get(sleep_stage)
+            parser.add_general_sleep(self._general_sleep_seconds)
+            return None
+        return stage_request, modified
+
+    def _is_aggregated(self, entity: GoogleFitSensorDescription) -> bool:
+        """Return whether a sensor is totalled with the aggregate endpoint."""
+        return (
+            self._aggregate_sums
+            and isinstance(entity, SumPointsSensorDescription)
+            and not entity.is_sleep
+        )
+
+    def _get_aggregate_request(
+        self, period_seconds: int, entities: list[GoogleFitSensorDescription]
+    ) -> FitRequest:
+        """Return one aggregate request for every summed sensor with the same period.
+
+        The whole period is a single bucket, so Google returns one total per source.
+        """
+        start_ns, end_ns = self._get_interval(period_seconds).split("-")
+        millis = NANOSECONDS_SECONDS_CONVERSION // 1000
+        return FitRequest(
+            ENDPOINT_DATASET_AGGREGATE,
+            AGGREGATE_SOURCE,
+            (
+                ("startTimeMillis", int(start_ns) // millis),
+                ("endTimeMillis", int(end_ns) // millis),
+            ),
+            tuple(dict.fromkeys(entity.source for entity in entities)),
+        )
+
+    def _get_aggregate_body(self, request: FitRequest) -> dict[str, Any]:
+        """Return the body of an aggregate request."""
+        params = dict(request.params)
+        return {
+            "aggregateBy": [{"dataSourceId": source} for source in request.sources],
+            "bucketByTime": {
+                "durationMillis": params["endTimeMillis"] - params["startTimeMillis"]
+            },
+            "startTimeMillis": params["startTimeMillis"],
+            "endTimeMillis": params["endTimeMillis"],
+        }
+
+    def _get_request(self, entity: GoogleFitSensorDescription) -> FitRequest:
+        """Return the API request needed to update a single sensor."""
+        if isinstance(entity, SumPointsSensorDescription):
+            return FitRequest(
+                ENDPOINT_DATASETS_GET,
+                entity.source,
+                (("datasetId", self._get_dataset_id(entity)),),
+            )
+        if isinstance(entity, LastPointSensorDescription):
+            if entity.data_key in self._latest_points:
+                return FitRequest(
+                    ENDPOINT_DATASETS_GET,
+                    entity.source,
+                    (
+                        (
+                            "datasetId",
+                            self._latest_points[entity.data_key].get_dataset_id(
+                                self._request_time
+                            ),
+                        ),
+                        ("limit", LATEST_POINT_LIMIT),
+                    ),
+                )
+            return FitRequest(ENDPOINT_DATA_POINT_CHANGES_LIST, entity.source)
+        if isinstance(entity, SumSessionSensorDescription):
+            return self._get_session_request(
+                entity.source,
+                None if entity.list_all_activities else entity.activity_id,
+            )
+        raise UpdateFailed(
+            f"Unknown sensor type for {entity.data_key}. Got: {type(entity)}"
+        )
+
+    def _build_request(self, service: FitService, request: FitRequest) -> HttpRequest:
+        """Build the googleapiclient request for an API request."""
+        params = dict(request.params)
+        if request.endpoint == ENDPOINT_DATASETS_GET:
+            return (
+                service.users()
+                .dataSources()
+                .datasets()
+                .get(userId="me", dataSourceId=request.source, **params)
+            )
+        if request.endpoint == ENDPOINT_DATA_POINT_CHANGES_LIST:
+            return (
+                service.users()
+                .dataSources()
+                .dataPointChanges()
+                .list(userId="me", dataSourceId=request.source, **params)
+            )
+        if request.endpoint == ENDPOINT_SESSIONS_LIST:
+            return service.users().sessions().list(userId="me", **params)
+        if request.endpoint == ENDPOINT_DATASET_AGGREGATE:
+            return (
+                service.users()
+                .dataset()
+                .aggregate(userId="me", body=self._get_aggregate_body(request))
+            )
+        raise UpdateFailed(f"Unknown API endpoint. Got: {request.endpoint}")
+
+    def _build_measured_request(
+        self, service: FitService, request: FitRequest, results: FitResults
+    ) -> HttpRequest:
+        """Build the googleapiclient request, recording the size of its response."""
+        http_request = self._build_request(service, request)
+        postproc = http_request.postproc
+
+        def _measure(resp: Any, content: bytes | str) -> FitResponse:
+            # Batch responses are already decoded, so count them as encoded bytes
+            results.response_bytes[request] = len(
+                content.encode() if isinstance(content, str) else content
+            )
+            return postproc(resp, content)
+
+        http_request.postproc = _measure
+        return http_request
+
+    def _fetch(self, service: FitService, requests: list[FitRequest]) -> FitResults:
+        """Fetch the raw API response for each request, one at a time.
+
+        Blocking. Must be run inside the executor.
+        """
+        results = FitResults()
+        for request in requests:
+            try:
+                results.responses.append(
+                    (
+                        request,
+                        self._build_measured_request(
+                            service, request, results
+                        ).execute(),
+                    )
+                )
+            except (HttpError, *TRANSIENT_ERRORS) as err:
+                results.errors.append((request, err))
+        return results
+
+    def _fetch_batch(
+        self, service: FitService, requests: list[FitRequest]
+    ) -> FitResults:
+        """Fetch the raw API response for each request in a single batch request.
+
+        Blocking. Must be run inside the executor.
+        """
+        results = FitResults()
+
+        def _store_response(
+            request_id: str, response: FitResponse, exception: HttpError | None
+        ) -> None:
+            request = requests[int(request_id)]
+            if exception is not None:
+                results.errors.append((request, exception))
+            else:
+                results.responses.append((request, response))
+
+        batch = service.new_batch_http_request(_store_response)
+        for index, request in enumerate(requests):
+            batch.add(
+                self._build_measured_request(service, request, results),
+                request_id=str(index),
+            )
+        try:
+            batch.execute()
+        except (HttpError, *TRANSIENT_ERRORS) as err:
+            # The batch request as a whole failed, so every request in it did
+            return FitResults(errors=[(request, err) for request in requests])
+        return results
+
+    async def _fetch_rest(self, requests: list[FitRequest]) -> FitResults:
+        """Fetch the raw API response for each request using the aiohttp client."""
+        client = self._auth.rest_client
+        results = FitResults()
+        for request in requests:
+            params = dict(request.params)
+            try:
+                if request.endpoint == ENDPOINT_DATASETS_GET:
+                    response, size = await client.get_dataset(
+                        request.source, params["datasetId"], limit=params.get("limit")
+                    )
+                elif request.endpoint == ENDPOINT_DATA_POINT_CHANGES_LIST:
+                    response, size = await client.list_data_point_changes(
+                        request.source
+                    )
+                elif request.endpoint == ENDPOINT_SESSIONS_LIST:
+                    response, size = await client.list_sessions(
+                        params.get("startTime"),
+                        params.get("endTime"),
+                        activity_type=params.get("activityType"),
+                        page_token=params.get("pageToken"),
+                        include_deleted=params.get("includeDeleted", False),
+                    )
+                elif request.endpoint == ENDPOINT_DATASET_AGGREGATE:
+                    response, size = await client.aggregate(
+                        self._get_aggregate_body(request)
+                    )
+                else:
+                    raise UpdateFailed(f"Unknown API endpoint. Got: {request.endpoint}")
+            except (ClientResponseError, *TRANSIENT_ERRORS) as err:
+                results.errors.append((request, err))
+            else:
+                results.responses.append((request, response))
+                results.response_bytes[request] = size
+        return results
+
+    async def _fetch_with_retry(
+        self,
+        service: FitService | None,
+        requests: list[FitRequest],
+        semaphore: asyncio.Semaphore,
+        deadline: float,
+    ) -> FitResults:
+        """Fetch the raw API response for each request, retrying failed requests.
+
+        Every API call is counted against the user and project quotas, waiting if
+        either is used up. Requests which were rate limited, hit a server error or
+        lost their connection are retried on their own after a backoff, as long as
+        the retry can start before the deadline. Requests which failed for any other
+        reason are not retried, but do not stop the others in the same job being
+        retried. Returns the responses and the errors of requests which still
+        failed.
+
+        The latency, executor wait and response size of every successful request
+        are recorded in the metrics. Requests in a batch share the batch latency.
+        """
+        responses: list[tuple[FitRequest, FitResponse]] = []
+        errors: list[tuple[FitRequest, Exception]] = []
+        for attempt in range(RETRY_MAX_ATTEMPTS):
+            await self.async_acquire_quota(len(requests))
+            async with semaphore, self._account_scheduler.request_slots:
+                start = time.monotonic()
+                executor_wait = 0.0
+                if self._api_transport == TRANSPORT_AIOHTTP:
+                    results = await self._fetch_rest(requests)
+                else:
+                    fetch = (
+                        self._fetch_batch
+                        if self._api_transport == TRANSPORT_BATCH
+                        else self._fetch
+                    )
+                    executor_wait, results = await self.hass.async_add_executor_job(
+                        _run_timed, start, fetch, service, requests
+                    )
+                seconds = time.monotonic() - start - executor_wait
+            for request, response in results.responses:
+                self.metrics.record_request(
+                    request.source,
+                    seconds,
+                    executor_wait,
+                    results.response_bytes.get(request, 0),
+                    count_items(response),
+                )
+            responses.extend(results.responses)
+            retryable = []
+            for request, err in results.errors:
+                if is_retryable(err):
+                    retryable.append((request, err))
+                else:
+                    errors.append((request, err))
+            if not retryable:
+                break
+
+            delay = get_retry_wait(
+                (err for _, err in retryable),
+                attempt,
+                deadline - self.hass.loop.time(),
+            )
+            if delay is None:
+                errors.extend(retryable)
+                break
+            LOGGER.debug(
+                "Retrying %u failed Google Fit requests in %.1fs: %s",
+                len(retryable),
+                delay,
+                retryable[0][1],
+            )
+            for request, _ in retryable:
+                self.metrics.source(request.source).retries += 1
+            await asyncio.sleep(delay)
+            requests = [request for request, _ in retryable]
+        return FitResults(responses=responses, errors=errors)
+
+    async def _fetch_job(
+        self,
+        service: FitService | None,
+        requests: list[FitRequest],
+        semaphore: asyncio.Semaphore,
+        deadline: float,
+    ) -> FitResults:
+        """Fetch the raw API response for each request, following every page.
+
+        Further pages of a session list are requested one after another and merged
+        into its first page, so it parses as a single response. A request fails if
+        any of its pages fail.
+        """
+        results = await self._fetch_with_retry(service, requests, semaphore, deadline)
+        responses: list[tuple[FitRequest, FitResponse]] = []
+        for request, response in results.responses:
+            while response.get("hasMoreData") and response.get("nextPageToken"):
+                page = await self._fetch_with_retry(
+                    service,
+                    [request.with_page_token(response["nextPageToken"])],
+                    semaphore,
+                    deadline,
+                )
+                if page.errors:
+                    results.errors.append((request, page.errors[0][1]))
+                    break
+                response = _merge_session_pages(response, page.responses[0][1])
+            else:
+                responses.append((request, response))
+        results.responses = responses
+        return results
+
+    def _parse(
+        self,
+        parser: GoogleFitParse,
+        entity: GoogleFitSensorDescription,
+        response: FitResponse,
+    ) -> None:
+        """Pass a raw API response to the parser as the correct fit type."""
+        if isinstance(entity, SumPointsSensorDescription):
+            parser.parse(entity, fit_object=response)
+        elif isinstance(entity, LastPointSensorDescription):
+            if entity.data_key in self._latest_points:
+                parser.parse(entity, fit_object=response)
+            else:
+                parser.parse(entity, fit_point=response)
+        elif isinstance(entity, SumSessionSensorDescription):
+            parser.parse(entity, fit_session=response)
+        else:
+            raise UpdateFailed(
+                f"Unknown sensor type for {entity.data_key}. Got: {type(entity)}"
+            )
+
+    def _parse_aggregate(
+        self,
+        parser: GoogleFitParse,
+        request: FitRequest,
+        entities: list[GoogleFitSensorDescription],
+        response: FitResponse,
+    ) -> dict[str, int]:
+        """Parse an aggregate response into each of its sensors.
+
+        Aggregated points carry no modification time, so a source is taken to have
+        been modified now if the value of any of its sensors changed. Returns the
+        modification time of each source in the request.
+        """
+        datasets = split_aggregate_response(response, request.sources)
+        now_millis = int(time.time() * 1000)
+        last_modified = dict.fromkeys(request.sources, 0)
+        for entity in entities:
+            parser.parse(entity, fit_object=datasets[entity.source])
+            if parser.fit_data[entity.data_key] != self._last_known.get(
+                entity.data_key
+            ):
+                last_modified[entity.source] = now_millis
+        return last_modified
+
+    def _requests_to_make(
+        self,
+    ) -> dict[FitRequest, list[GoogleFitSensorDescription]]:
+        """Return the API requests needed on this update call.
+
+        Sensors whose requests resolve to the same endpoint, source and parameters
+        share a single request, and are all updated from its response. Aggregated
+        sensors share one aggregate request for each period they sum over. Session
+        bounded sleep stage sensors join the sleep session request, and have their
+        own request made once its response arrives. If sessions are synced, every
+        session sensor shares the one sync request.
+        """
+        requests: dict[FitRequest, list[GoogleFitSensorDescription]] = {}
+        aggregated: dict[int, list[GoogleFitSensorDescription]] = {}
+        synced: list[GoogleFitSensorDescription] = []
+        self._request_time = datetime.today()
+
+        for entity in self.entity_descriptions:
+            if not self.is_source_available(entity.source):
+                continue
+
+            if not self._scheduler.is_due(entity.source):
+                LOGGER.debug(
+                    "Skipping API query for sensor '%s' as it is not yet due",
+                    entity.name,
+                )
+                continue
+
+            if self._is_aggregated(entity):
+                aggregated.setdefault(entity.period_seconds, []).append(entity)
+            elif self._session_sync is not None and self._is_session(entity):
+                synced.append(entity)
+            elif self._is_session_bounded(entity):
+                requests.setdefault(
+                    self._get_session_request(entity.source, SLEEP_ACTIVITY_ID), []
+                ).append(entity)
+            else:
+                requests.setdefault(self._get_request(entity), []).append(entity)
+
+        for period_seconds, entities in aggregated.items():
+            requests[self._get_aggregate_request(period_seconds, entities)] = entities
+        if self._session_sync is not None and synced:
+            requests[self._get_sync_request(self._session_sync, synced)] = synced
+        return requests
+
+    async def _fetch_all(
+        self,
+        service: FitService | None,
+        requests: dict[FitRequest, list[GoogleFitSensorDescription]],
+        parser: GoogleFitParse,
+        deadline: float,
+    ) -> tuple[dict[str, int], dict[str, str]]:
+        """Make all API requests concurrently and parse each response on arrival.
+
+        In batch transport mode the requests are grouped into as few batch requests
+        as possible, otherwise each is made on its own. The aiohttp transport makes
+        its requests directly from the event loop, the others run the
+        googleapiclient service inside the executor. At most max_concurrent_requests
+        API calls are in flight at once for this account, and at most the global
+        limit across every account. Failed calls are retried where possible. Calls
+        which have not completed by the deadline (event loop time) are abandoned
+        without discarding the responses that have already been parsed. Requests
+        which depend on a response, such as session bounded sleep stages, are
+        started as soon as it has been parsed.
+
+        A request which fails, or whose response cannot be parsed, only fails its
+        own data source. Authentication failures still fail the whole update.
+
+        Returns the most recent modification time seen for each data source which
+        was fetched, and the reason each failed data source failed.
+        """
+        unique_requests = list(requests)
+        if self._api_transport == TRANSPORT_BATCH:
+            jobs = [
+                unique_requests[index : index + MAX_BATCH_REQUESTS]
+                for index in range(0, len(unique_requests), MAX_BATCH_REQUESTS)
+            ]
+        else:
+            jobs = [[request] for request in unique_requests]
+
+        semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+        tasks = {
+            asyncio.create_task(self._fetch_job(service, job, semaphore, deadline)): job
+            for job in jobs
+        }
+        pending = set(tasks)
+        last_modified: dict[str, int] = {}
+        failed: dict[str, str] = {}
+        # Sleep stage requests made this update, with their sessions' modified time
+        sleep_stages: dict[FitRequest, int] = {}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(deadline - self.hass.loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    LOGGER.warning(
+                        "Timed out waiting for Google Fit data for: %s. "
+                        "These sensors will not be updated this time",
+                        ", ".join(
+                            str(entity.name)
+                            for task in pending
+                            for request in tasks[task]
+                            for entity in requests[request]
+                        ),
+                    )
+                    for task in pending:
+                        for request in tasks[task]:
+                            for source in request.sources:
+                                failed.setdefault(source, "Timed out")
+                    break
+                for task in done:
+                    try:
+                        results = task.result()
+                    except Exception as err:
+                        results = FitResults(
+                            errors=[(request, err) for request in tasks[task]]
+                        )
+                    for request, err in results.errors:
+                        if get_error_status(err) in (401, 403):
+                            raise err
+                        if (
+                            self._session_sync is not None
+                            and request.endpoint == ENDPOINT_SESSIONS_LIST
+                            and get_error_status(err) in (400, 410)
+                        ):
+                            # The sync token has expired or is invalid
+                            self._session_sync.reset()
+                        LOGGER.warning(
+                            "Unable to fetch Google Fit data for %s: %s",
+                            request.source,
+                            err,
+                        )
+                        self.metrics.source(request.source).errors += 1
+                        for source in request.sources:
+                            failed.setdefault(source, str(err))
+                    for request, response in results.responses:
+                        start = time.perf_counter()
+                        try:
+                            if request.endpoint == ENDPOINT_DATASET_AGGREGATE:
+                                modified = self._parse_aggregate(
+                                    parser, request, requests[request], response
+                                )
+                            else:
+                                for entity in requests[request]:
+                                    if (
+                                        request.endpoint == ENDPOINT_SESSIONS_LIST
+                                        and self._is_session_bounded(entity)
+                                    ):
+                                        # Parsed from the sleep stage request
+                                        continue
+                                    self._parse(parser, entity, response)
+                                modified = dict.fromkeys(
+                                    request.sources, get_last_modified_millis(response)
+                                )
+                            follow_up = self._get_sleep_stage_request(
+                                parser, request, requests[request], response
+                            )
+                        except Exception as err:
+                            LOGGER.warning(
+                                "Unable to parse Google Fit data for %s: %s",
+                                request.source,
+                                err,
+                            )
+                            self.metrics.source(request.source).errors += 1
+                            for source in request.sources:
+                                failed.setdefault(source, str(err))
+                            continue
+                        self.metrics.record_parse(
+                            request.source, time.perf_counter() - start
+                        )
+                        for source, millis in modified.items():
+                            last_modified[source] = max(
+                                last_modified.get(source, 0), millis
+                            )
+                        if request in sleep_stages:
+                            self._sleep_stages = (request, sleep_stages[request])
+                            self._general_sleep_seconds = parser.general_sleep_seconds
+                        if follow_up is not None:
+                            stage_request, sleep_stages[stage_request] = follow_up
+                            requests[stage_request] = [
+                                entity
+                                for entity in requests[request]
+                                if self._is_session_bounded(entity)
+                            ]
+                            task = asyncio.create_task(
+                                self._fetch_job(
+                                    service, [stage_request], semaphore, deadline
+                                )
+                            )
+                            tasks[task] = [stage_request]
+                            pending.add(task)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return last_modified, failed
+
     async def _async_update_data(self) -> FitnessData | None:
         """Update data via library."""
         LOGGER.debug(
@@ -122,132 +1116,97 @@ class Coordinator(DataUpdateCoordinator):
 
         # Start by initialising data to None
         self.fitness_data = None
+        refresh_start = time.monotonic()
         try:
-            async with async_timeout.timeout(30):
-                service = await self._auth.get_resource(self.hass)
-                parser = GoogleFitParse()
-                # Tracks whether we have retrieved sleep data for this update call
-                fetched_sleep = False
-
-                def _do_update(entity: GoogleFitSensorDescription) -> bool:
-                    # Default is to update
-                    do_update = True
-
-                    if entity.infrequent_update:
-                        if self.sensor_update_counter == 0:
-                            LOGGER.debug(
-                                "Querying infrequently updated sensor '%s'", entity.name
-                            )
-                        else:
-                            LOGGER.debug(
-                                "Skipping API query for infrequently updated sensor '%s'",
-                                entity.name,
-                            )
-                            do_update = False
-
-                    if (
-                        isinstance(entity, SumPointsSensorDescription)
-                        and entity.is_sleep
-                    ):
-                        if fetched_sleep:
-                            # Only need to call API once to get all different sleep segments
-                            do_update = False
-
-                    return do_update
-
-                def _get_data(source: str, dataset: str) -> FitnessObject:
-                    return (
-                        service.users()
-                        .dataSources()
-                        .datasets()
-                        .get(userId="me", dataSourceId=source, datasetId=dataset)
-                        .execute()
-                    )
+            deadline = self.hass.loop.time() + UPDATE_TIMEOUT
+            service: FitService | None = None
+            async with async_timeout.timeout(UPDATE_TIMEOUT):
+                if self._api_transport == TRANSPORT_AIOHTTP:
+                    await self._auth.check_and_refresh_token()
+                else:
+                    service = await self._auth.get_resource(self.hass)
+            await self.async_discover_sources()
+            parser = GoogleFitParse(
+                self._incremental_sums, self._latest_points, self._session_sync
+            )
 
-                def _get_data_changes(source: str) -> FitnessDataPoint:
-                    return (
-                        service.users()
-                        .dataSources()
-                        .dataPointChanges()
-                        .list(userId="me", dataSourceId=source)
-                        .execute()
-                    )
+            requests = self._requests_to_make()
+            last_modified, failed = await self._fetch_all(
+                service, requests, parser, deadline
+            )
+            sources = {source for request in requests for source in request.sources}
+            for source in sources:
+                if source in failed:
+                    self._scheduler.record_failure(source, failed[source])
+                else:
+                    self._scheduler.record(source, last_modified.get(source, 0))
+            if sources and failed.keys() >= sources:
+                raise UpdateFailed(
+                    "Unable to fetch any Google Fit data: "
+                    + "; ".join(f"{source}: {err}" for source, err in failed.items())
+                )
 
-                def _get_session(activity_id: int) -> FitnessSessionResponse:
-                    """Return a list of sessions for the activity whose end time was in last 24h."""
-                    end_time = datetime.utcnow().isoformat() + "Z"
-                    start_time = (
-                        datetime.utcnow() - timedelta(days=1)
-                    ).isoformat() + "Z"
-                    return (
-                        service.users()
-                        .sessions()
-                        .list(
-                            userId="me",
-                            activityType=activity_id,
-                            startTime=start_time,
-                            endTime=end_time,
-                        )
-                        .execute()
-                    )
+            # Update globally stored data with fetched and parsed data
+            self.fitness_data = parser.fit_data
 
-                for entity in ENTITY_DESCRIPTIONS:
-                    if _do_update(entity):
-                        if isinstance(entity, SumPointsSensorDescription):
-                            dataset = self._get_interval(entity.period_seconds)
-                            response = await self.hass.async_add_executor_job(
-                                _get_data, entity.source, dataset
-                            )
+            # Google Fit provides us with a total sleep time that also includes
+            # time awake as well. To more accurately reflect actual sleep time
+            # we should readjust this before submitting the data. The sleep stages
+            # are fetched separately from the sessions, so if they failed the sleep
+            # time is held back rather than reported with time awake included.
+            if self.fitness_data is not None:
+                if (
+                    self.fitness_data["sleepSeconds"] is not None
+                    and self.fitness_data["awakeSeconds"] is None
+                ):
+                    self.fitness_data["sleepSeconds"] = None
+                elif (
+                    self.fitness_data["sleepSeconds"] is not None
+                    and self.fitness_data["sleepSeconds"]
+                    >= self.fitness_data["awakeSeconds"]
+                ):
+                    self.fitness_data["sleepSeconds"] -= self.fitness_data[
+                        "awakeSeconds"
+                    ]
 
-                            if entity.is_sleep:
-                                fetched_sleep = True
+            if self.fitness_data is not None:
+                self._last_known.update(
+                    (data_key, value)
+                    for data_key, value in self.fitness_data.items()
+                    if value is not None and data_key != "lastUpdate"
+                )
+            if self._cache is not None:
+                self._cache.async_schedule_save(self._get_cached_state)
 
-                            parser.parse(entity, fit_object=response)
-                        elif isinstance(entity, LastPointSensorDescription):
-                            response = await self.hass.async_add_executor_job(
-                                _get_data_changes, entity.source
-                            )
-                            parser.parse(entity, fit_point=response)
-                        elif isinstance(entity, SumSessionSensorDescription):
-                            response = await self.hass.async_add_executor_job(
-                                _get_session, entity.activity_id
-                            )
-                            parser.parse(entity, fit_session=response)
-                        # Single data point fetches
-                        else:
-                            raise UpdateFailed(
-                                f"Unknown sensor type for {entity.data_key}. Got: {type(entity)}"
-                            )
+            # Only wake up again once the next data source is due, but no later
+            # than the next data source discovery, on this account's phase
+            wait = max(
+                min(
+                    self._scheduler.seconds_until_next_due(self.available_sources),
+                    SOURCE_DISCOVERY_INTERVAL_SECONDS,
+                ),
+                SCHEDULER_MIN_WAKE_SECONDS,
+            )
+            self.update_interval = timedelta(
+                seconds=self._account_scheduler.get_wait_seconds(
+                    self._config.entry_id, self._poll_interval_seconds, wait
+                )
+            )
 
-                # Update globally stored data with fetched and parsed data
-                self.fitness_data = parser.fit_data
-
-                # Google Fit provides us with a total sleep time that also includes
-                # time awake as well. To more accurately reflect actual sleep time
-                # we should readjust this before submitting the data
-                if self.fitness_data is not None:
-                    if (
-                        self.fitness_data["sleepSeconds"] is not None
-                        and self.fitness_data["awakeSeconds"] is not None
-                        and self.fitness_data["sleepSeconds"]
-                        >= self.fitness_data["awakeSeconds"]
-                    ):
-                        self.fitness_data["sleepSeconds"] -= self.fitness_data[
-                            "awakeSeconds"
-                        ]
-
-                # Increment and modulo the counter
-                self.sensor_update_counter = (
-                    self.sensor_update_counter + 1
-                ) % self.infrequent_interval_multiplier
-
-        except HttpError as err:
-            if 400 <= err.status_code < 500:
+        except UpdateFailed:
+            raise
+        except (HttpError, ClientResponseError) as err:
+            # Being rate limited is not a reason to re-authenticate
+            status = get_error_status(err)
+            if status is not None and 400 <= status < 500 and status != 429:
                 raise ConfigEntryAuthFailed(
                     "OAuth session is not valid, re-authentication required."
                 ) from err
-            raise err
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
         except Exception as err:
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+        finally:
+            self.metrics.refreshes += 1
+            self.metrics.last_refresh_seconds = time.monotonic() - refresh_start
 
         return self.fitness_data
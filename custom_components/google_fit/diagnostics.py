@@ -0,0 +1,37 @@
+"""Diagnostics support for Google Fit."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .api import AsyncConfigEntryAuth
+from .const import DOMAIN
+from .coordinator import Coordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    The OAuth token is deliberately left out.
+    """
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinator: Coordinator = entry_data["coordinator"]
+    auth: AsyncConfigEntryAuth = entry_data["auth"]
+    return {
+        "options": dict(entry.options),
+        "last_update_success": coordinator.last_update_success,
+        "update_interval_seconds": (
+            coordinator.update_interval.total_seconds()
+            if coordinator.update_interval is not None
+            else None
+        ),
+        "sources": coordinator.get_source_status(),
+        "metrics": coordinator.metrics.as_dict(),
+        "service_cache": asdict(auth.service_metrics),
+    }
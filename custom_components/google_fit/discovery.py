@@ -0,0 +1,152 @@
+"""Persistent discovery document cache for the Google Fit API."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, TypedDict
+
+from aiohttp import ClientError, ClientTimeout
+from googleapiclient.discovery_cache import get_static_doc
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DATA_DISCOVERY_CACHE,
+    DISCOVERY_CACHE_MAX_ENTRIES,
+    DISCOVERY_CACHE_TTL,
+    DISCOVERY_STORAGE_KEY,
+    DISCOVERY_STORAGE_VERSION,
+    DISCOVERY_URL,
+    DOMAIN,
+    LOGGER,
+)
+
+
+class CachedDocument(TypedDict):
+    """A single discovery document as held in the cache."""
+
+    content: str
+    etag: str | None
+    fetched: float
+
+
+class DiscoveryDocumentCache:
+    """Discovery documents shared by all config entries and persisted to disk.
+
+    Documents are served from the cache until they are older than the TTL, at which
+    point they are revalidated with their ETag so an unchanged document costs a
+    single 304 response. If Google cannot be reached the stale document is used, or
+    the static document bundled with googleapiclient if nothing has been cached.
+    """
+
+    def __init__(self, hass: HomeAssistant, discovery_url: str = DISCOVERY_URL) -> None:
+        """Initialise the cache. async_load must be awaited before use.
+
+        discovery_url is a template for the document URL, formatted with the api
+        and apiVersion.
+        """
+        self._hass = hass
+        self._discovery_url = discovery_url
+        self._store: Store[dict[str, CachedDocument]] = Store(
+            hass, DISCOVERY_STORAGE_VERSION, DISCOVERY_STORAGE_KEY
+        )
+        self._documents: dict[str, CachedDocument] = {}
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load persisted documents from disk, if not already loaded."""
+        async with self._lock:
+            if self._loaded:
+                return
+            self._documents = await self._store.async_load() or {}
+            self._loaded = True
+            LOGGER.debug(
+                "Loaded %u cached discovery documents from disk", len(self._documents)
+            )
+
+    def _async_schedule_save(self) -> None:
+        """Evict the oldest documents beyond the size bound and save to disk."""
+        while len(self._documents) > DISCOVERY_CACHE_MAX_ENTRIES:
+            oldest = min(
+                self._documents, key=lambda url: self._documents[url]["fetched"]
+            )
+            self._documents.pop(oldest)
+        self._store.async_delay_save(lambda: self._documents, 10)
+
+    async def async_get_document(
+        self, api: str = "fitness", version: str = "v1"
+    ) -> str:
+        """Return the discovery document for the given API as a JSON string."""
+        url = self._discovery_url.format(api=api, apiVersion=version)
+        async with self._lock:
+            cached = self._documents.get(url)
+            if (
+                cached is not None
+                and time.time() - cached["fetched"] < DISCOVERY_CACHE_TTL
+            ):
+                return cached["content"]
+
+            try:
+                document = await self._async_fetch(url, cached)
+            except (ClientError, TimeoutError) as ex:
+                if cached is not None:
+                    LOGGER.warning(
+                        "Unable to revalidate discovery document for %s. "
+                        "Using stale cached copy: %s",
+                        api,
+                        ex,
+                    )
+                    return cached["content"]
+                static = await self._hass.async_add_executor_job(
+                    get_static_doc, api, version
+                )
+                if static is None:
+                    raise
+                LOGGER.warning(
+                    "Unable to fetch discovery document for %s. "
+                    "Using static bundled copy: %s",
+                    api,
+                    ex,
+                )
+                return static
+
+            self._documents[url] = document
+            self._async_schedule_save()
+            return document["content"]
+
+    async def _async_fetch(
+        self, url: str, cached: CachedDocument | None
+    ) -> CachedDocument:
+        """Fetch a discovery document, revalidating the cached copy if there is one."""
+        headers: dict[str, Any] = {}
+        if cached is not None and cached["etag"] is not None:
+            headers["If-None-Match"] = cached["etag"]
+
+        async with async_get_clientsession(self._hass).get(
+            url, headers=headers, timeout=ClientTimeout(total=10), raise_for_status=True
+        ) as response:
+            if response.status == 304 and cached is not None:
+                LOGGER.debug("Cached discovery document for %s still valid", url)
+                return CachedDocument(
+                    content=cached["content"], etag=cached["etag"], fetched=time.time()
+                )
+            LOGGER.debug("Fetched new discovery document from %s", url)
+            return CachedDocument(
+                content=await response.text(),
+                etag=response.headers.get("ETag"),
+                fetched=time.time(),
+            )
+
+
+async def async_get_discovery_cache(hass: HomeAssistant) -> DiscoveryDocumentCache:
+    """Return the discovery cache shared by all Google Fit config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_DISCOVERY_CACHE not in domain_data:
+        domain_data[DATA_DISCOVERY_CACHE] = DiscoveryDocumentCache(hass)
+    cache: DiscoveryDocumentCache = domain_data[DATA_DISCOVERY_CACHE]
+    await cache.async_load()
+    return cache
@@ -0,0 +1,364 @@
+"""Incremental fetching of Google Fit dataset points and sessions."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from .api_types import FitnessObject, FitnessSessionResponse
+from .const import (
+    INCREMENTAL_FULL_REFRESH_SECONDS,
+    INCREMENTAL_OVERLAP_SECONDS,
+    LATEST_POINT_FULL_REFRESH_SECONDS,
+    LATEST_POINT_LOOKBACK_SECONDS,
+    LOGGER,
+    NANOSECONDS_SECONDS_CONVERSION,
+    SESSION_SYNC_FULL_REFRESH_SECONDS,
+    SESSION_SYNC_WINDOW_SECONDS,
+)
+from .store import PointStore
+
+
+class IncrementalSum:
+    """Running sum of the points from one data source over its sensor window.
+
+    The first request for a window fetches every point in it. After that only the
+    points since the last seen end time (the high-water mark) are requested, with a
+    small overlap to catch late writes. Points are held in a compact store, and
+    every held point ending within a re-fetched range is replaced by the response,
+    so points which Google has since split or extended are not counted twice. Points which slide out of a rolling window are expired, and the whole
+    window is dropped at midnight for daily sensors. A full re-fetch is forced
+    periodically to pick up any points that Google received long after they were
+    recorded.
+    """
+
+    def __init__(self, period_seconds: int = 0) -> None:
+        """Initialise an empty sum.
+
+        period_seconds has the same meaning as for SumPointsSensorDescription.
+        """
+        self._period_seconds = period_seconds
+        self._points = PointStore()
+        self._total: int | float = 0
+        self._window_start_ns = 0
+        self._requested_window_start_ns = 0
+        self._requested_start_ns = 0
+        self._last_full_fetch = 0.0
+        self._full_fetch = True
+        self.max_end_time_ns = 0
+        self.last_modified_millis = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the sum, to be persisted."""
+        return {
+            "points": self._points.as_dict(),
+            "total": self._total,
+            "window_start_ns": self._window_start_ns,
+            "last_full_fetch": self._last_full_fetch,
+            "max_end_time_ns": self.max_end_time_ns,
+            "last_modified_millis": self.last_modified_millis,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore state previously returned by as_dict()."""
+        self._points = PointStore.from_dict(data["points"])
+        self._total = data["total"]
+        self._window_start_ns = data["window_start_ns"]
+        self._last_full_fetch = data["last_full_fetch"]
+        self.max_end_time_ns = data["max_end_time_ns"]
+        self.last_modified_millis = data["last_modified_millis"]
+
+    def _get_window_start_ns(self, request_time: datetime) -> int:
+        """Return the start of the sensor window in nanoseconds."""
+        if self._period_seconds == 0:
+            start = datetime.combine(request_time.date(), datetime.min.time())
+            return int(start.timestamp()) * NANOSECONDS_SECONDS_CONVERSION
+        return (
+            int(request_time.timestamp()) - self._period_seconds
+        ) * NANOSECONDS_SECONDS_CONVERSION
+
+    def get_dataset_id(self, request_time: datetime) -> str:
+        """Return the dataset ID to request on this update.
+
+        The range ends at request_time, shared by every request in the update so
+        sensors of the same source get identical requests. Must be followed by a
+        call to update() with the response.
+        """
+        now = request_time.timestamp()
+        window_start = self._get_window_start_ns(request_time)
+        now_ns = int(now * NANOSECONDS_SECONDS_CONVERSION)
+
+        self._full_fetch = (
+            self.max_end_time_ns == 0
+            or now - self._last_full_fetch >= INCREMENTAL_FULL_REFRESH_SECONDS
+            or (self._period_seconds == 0 and window_start != self._window_start_ns)
+        )
+        self._requested_window_start_ns = window_start
+        self._requested_start_ns = window_start
+        if not self._full_fetch:
+            self._requested_start_ns = max(
+                window_start,
+                self.max_end_time_ns
+                - INCREMENTAL_OVERLAP_SECONDS * NANOSECONDS_SECONDS_CONVERSION,
+            )
+        return f"{self._requested_start_ns}-{now_ns}"
+
+    def update(self, response: FitnessObject, is_int: bool) -> int | float:
+        """Add the points from a response to the sum and return the new total."""
+        self._window_start_ns = self._requested_window_start_ns
+        if self._full_fetch:
+            self._points.clear()
+            self._total = 0
+            self._last_full_fetch = datetime.today().timestamp()
+        else:
+            # Remove points which have slid out of a rolling window
+            self._total -= self._points.expire(self._window_start_ns)
+            # The response holds every point in the overlap, however Google has
+            # split them since, so it replaces the held ones
+            self._total -= self._points.remove_after(self._requested_start_ns)
+
+        value_key = "intVal" if is_int else "fpVal"
+        for point in response.get("point", []):
+            value = point.get("value")[0].get(value_key)
+            if value is None:
+                continue
+            end_time_ns = int(point.get("endTimeNanos"))
+            self._total += value - self._points.put(
+                int(point.get("startTimeNanos")), end_time_ns, value
+            )
+            self.max_end_time_ns = max(self.max_end_time_ns, end_time_ns)
+            self.last_modified_millis = max(
+                self.last_modified_millis, int(point.get("modifiedTimeMillis", 0))
+            )
+
+        LOGGER.debug(
+            "%s fetch for %s returned %u points. Holding %u points in %u bytes",
+            "Full" if self._full_fetch else "Incremental",
+            response.get("dataSourceId"),
+            len(response.get("point", [])),
+            len(self._points),
+            self._points.nbytes,
+        )
+        return round(self._total) if is_int else round(self._total, 2)
+
+
+class LatestPoint:
+    """Most recent value of a data source, fetched with a bounded request.
+
+    Google applies the dataset limit from the end of the requested range, so a
+    limited request returns only the newest points however wide the range is. The
+    first request looks back over the whole lookback period. After that only the
+    range since the last known point is requested, and the last known value is kept
+    when that range is empty. The full lookback is re-requested periodically so
+    deleted points are eventually noticed.
+    """
+
+    def __init__(self) -> None:
+        """Initialise with no known value."""
+        self.value: int | float | None = None
+        self.end_time_ns = 0
+        self._last_full_fetch = 0.0
+        self._full_fetch = True
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the latest point, to be persisted."""
+        return {
+            "value": self.value,
+            "end_time_ns": self.end_time_ns,
+            "last_full_fetch": self._last_full_fetch,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore state previously returned by as_dict()."""
+        self.value = data["value"]
+        self.end_time_ns = data["end_time_ns"]
+        self._last_full_fetch = data["last_full_fetch"]
+
+    def get_dataset_id(self, request_time: datetime) -> str:
+        """Return the dataset ID to request on this update.
+
+        The range ends at request_time, shared by every request in the update so
+        sensors of the same source get identical requests. Must be followed by a
+        call to update() with the response.
+        """
+        now = request_time.timestamp()
+        now_ns = int(now * NANOSECONDS_SECONDS_CONVERSION)
+        self._full_fetch = (
+            self.end_time_ns == 0
+            or now - self._last_full_fetch >= LATEST_POINT_FULL_REFRESH_SECONDS
+        )
+        if self._full_fetch:
+            start = int(now - LATEST_POINT_LOOKBACK_SECONDS)
+            return f"{start * NANOSECONDS_SECONDS_CONVERSION}-{now_ns}"
+        return f"{self.end_time_ns}-{now_ns}"
+
+    def update(
+        self, response: FitnessObject, is_int: bool, index: int = 0
+    ) -> int | float | None:
+        """Update the latest value from a response and return it."""
+        value_key = "intVal" if is_int else "fpVal"
+        latest_time = 0
+        value = None
+        for point in response.get("point", []):
+            end_time_ns = int(point.get("endTimeNanos"))
+            if end_time_ns > latest_time:
+                values = point.get("value")
+                if len(values) > index and values[index].get(value_key) is not None:
+                    latest_time = end_time_ns
+                    value = values[index].get(value_key)
+
+        if self._full_fetch:
+            # The full lookback is authoritative, even if it found an older point
+            self._last_full_fetch = datetime.today().timestamp()
+            self.value = None
+            self.end_time_ns = 0
+            if value is None:
+                LOGGER.debug(
+                    "No data points found for %s", response.get("dataSourceId")
+                )
+
+        if value is not None and latest_time >= self.end_time_ns:
+            self.value = value if is_int else round(value, 2)
+            self.end_time_ns = latest_time
+
+        return self.value
+
+
+class SessionSpan(NamedTuple):
+    """The activity and times of a single session, in milliseconds."""
+
+    activity_type: int
+    start_millis: int
+    end_millis: int
+    modified_millis: int
+
+
+class SessionSync:
+    """Sessions of every activity type, kept up to date with a sync token.
+
+    Google only returns a sync token when sessions are listed without a start and
+    end time. The first request lists every session changed in the last 30 days.
+    Later requests pass the token, and only receive the sessions changed or deleted
+    since, along with the token for the next sync. Sessions are held by ID, so a
+    changed session replaces its old version. Sessions which ended before the sync
+    window are dropped. The full list is requested again periodically, or straight
+    away if the token is rejected.
+    """
+
+    def __init__(self) -> None:
+        """Initialise with no known sessions."""
+        self._sessions: dict[str, SessionSpan] = {}
+        self._sync_token: str | None = None
+        self._last_full_sync = 0.0
+        self._full_sync = True
+        self._parsed: FitnessSessionResponse | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the sync, to be persisted."""
+        return {
+            "sessions": {
+                session_id: list(span) for session_id, span in self._sessions.items()
+            },
+            "sync_token": self._sync_token,
+            "last_full_sync": self._last_full_sync,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Restore state previously returned by as_dict()."""
+        self._sessions = {
+            session_id: SessionSpan(*span)
+            for session_id, span in data["sessions"].items()
+        }
+        self._sync_token = data["sync_token"]
+        self._last_full_sync = data["last_full_sync"]
+
+    def reset(self) -> None:
+        """Forget the sync token, so every session is listed again next time."""
+        self._sync_token = None
+
+    def get_params(self, request_time: datetime) -> tuple[tuple[str, Any], ...]:
+        """Return the sessions.list parameters to request on this update.
+
+        Whether a full sync is due is judged at request_time, the time shared by
+        every request in the update. Must be followed by a call to update() with
+        the response.
+        """
+        now = request_time.timestamp()
+        self._full_sync = (
+            self._sync_token is None
+            or now - self._last_full_sync >= SESSION_SYNC_FULL_REFRESH_SECONDS
+        )
+        if self._full_sync:
+            return (("includeDeleted", True),)
+        return (("includeDeleted", True), ("pageToken", self._sync_token))
+
+    def update(self, response: FitnessSessionResponse) -> None:
+        """Apply the sessions changed and deleted in a response.
+
+        A response is only applied once, however many sensors are parsed from it.
+        """
+        if response is self._parsed:
+            return
+        self._parsed = response
+
+        if self._full_sync:
+            self._sessions.clear()
+            self._last_full_sync = datetime.today().timestamp()
+        sessions = response.get("session") or []
+        for session in sessions:
+            self._sessions[session["id"]] = SessionSpan(
+                int(session.get("activityType", 0)),
+                int(session["startTimeMillis"]),
+                int(session["endTimeMillis"]),
+                int(session.get("modifiedTimeMillis", 0)),
+            )
+        deleted = response.get("deletedSession") or []
+        for session in deleted:
+            self._sessions.pop(session.get("id"), None)
+        if response.get("nextPageToken"):
+            self._sync_token = response["nextPageToken"]
+        self._expire()
+
+        LOGGER.debug(
+            "%s session sync returned %u changed and %u deleted sessions. "
+            "Holding %u sessions",
+            "Full" if self._full_sync else "Incremental",
+            len(sessions),
+            len(deleted),
+            len(self._sessions),
+        )
+
+    def _expire(self) -> None:
+        """Drop sessions which ended before the sync window."""
+        window_start = (
+            datetime.today().timestamp() - SESSION_SYNC_WINDOW_SECONDS
+        ) * 1000
+        self._sessions = {
+            session_id: span
+            for session_id, span in self._sessions.items()
+            if span.end_millis >= window_start
+        }
+
+    def get_sessions(self, activity_type: int) -> list[SessionSpan]:
+        """Return the sessions of an activity which ended within the sync window."""
+        self._expire()
+        return [
+            span
+            for span in self._sessions.values()
+            if span.activity_type == activity_type
+        ]
+
+    def total_seconds(self) -> dict[int, float]:
+        """Return the total duration of the sessions of each activity in seconds."""
+        self._expire()
+        summed_millis: dict[int, int] = {}
+        for span in self._sessions.values():
+            summed_millis[span.activity_type] = (
+                summed_millis.get(span.activity_type, 0)
+                + span.end_millis
+                - span.start_millis
+            )
+        return {
+            activity_type: millis / 1000
+            for activity_type, millis in summed_millis.items()
+        }
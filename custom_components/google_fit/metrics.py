@@ -0,0 +1,181 @@
+"""Metrics on how the Google Fit API is queried."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .api_types import FitResponse
+
+
+def count_items(response: FitResponse) -> int:
+    """Return the number of points or sessions in an API response."""
+    if "bucket" in response:
+        return sum(
+            len(dataset.get("point", []))
+            for bucket in response["bucket"]
+            for dataset in bucket.get("dataset", [])
+        )
+    return len(
+        response.get("point")
+        or response.get("insertedDataPoint")
+        or response.get("session")
+        or []
+    )
+
+
+@dataclass
+class SourceMetrics:
+    """Metrics for the API requests of a single data source.
+
+    Totals are kept since start up, along with the values from the last request.
+    Times are in seconds.
+    """
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    response_bytes: int = 0
+    points: int = 0
+    request_seconds: float = 0
+    executor_wait_seconds: float = 0
+    parse_seconds: float = 0
+    last_request_seconds: float = 0
+    last_response_bytes: int = 0
+    last_points: int = 0
+    last_parse_seconds: float = 0
+
+
+@dataclass
+class FitMetrics:
+    """Metrics for every API request made for one account."""
+
+    sources: dict[str, SourceMetrics] = field(default_factory=dict)
+    refreshes: int = 0
+    last_refresh_seconds: float = 0
+
+    def source(self, source: str) -> SourceMetrics:
+        """Return the metrics for a data source."""
+        if source not in self.sources:
+            self.sources[source] = SourceMetrics()
+        return self.sources[source]
+
+    def record_request(
+        self,
+        source: str,
+        seconds: float,
+        executor_wait_seconds: float,
+        response_bytes: int,
+        points: int,
+    ) -> None:
+        """Record a successful request."""
+        metrics = self.source(source)
+        metrics.requests += 1
+        metrics.request_seconds += seconds
+        metrics.executor_wait_seconds += executor_wait_seconds
+        metrics.response_bytes += response_bytes
+        metrics.points += points
+        metrics.last_request_seconds = seconds
+        metrics.last_response_bytes = response_bytes
+        metrics.last_points = points
+
+    def record_parse(self, source: str, seconds: float) -> None:
+        """Record the time taken to parse a response."""
+        metrics = self.source(source)
+        metrics.parse_seconds += seconds
+        metrics.last_parse_seconds = seconds
+
+    @property
+    def requests(self) -> int:
+        """Return the number of successful requests for all sources."""
+        return sum(metrics.requests for metrics in self.sources.values())
+
+    @property
+    def errors(self) -> int:
+        """Return the number of failed requests for all sources."""
+        return sum(metrics.errors for metrics in self.sources.values())
+
+    @property
+    def retries(self) -> int:
+        """Return the number of retried requests for all sources."""
+        return sum(metrics.retries for metrics in self.sources.values())
+
+    @property
+    def response_bytes(self) -> int:
+        """Return the bytes received for all sources."""
+        return sum(metrics.response_bytes for metrics in self.sources.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a dictionary."""
+        return asdict(self)
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(
+    accounts: dict[str, tuple[FitMetrics, dict[str, Any]]],
+) -> str:
+    """Return metrics for every account in the Prometheus text format.
+
+    accounts maps each account to its metrics and its cached service metrics.
+    """
+    families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def add(name: str, kind: str, help_text: str, labels: str, value: float) -> None:
+        family = families.setdefault(f"google_fit_{name}", (kind, help_text, []))
+        family[2].append(f"google_fit_{name}{{{labels}}} {value}")
+
+    for account, (metrics, service_metrics) in accounts.items():
+        account_label = f'account="{_escape(account)}"'
+        add(
+            "refreshes_total",
+            "counter",
+            "Coordinator refreshes.",
+            account_label,
+            metrics.refreshes,
+        )
+        add(
+            "last_refresh_seconds",
+            "gauge",
+            "Duration of the last coordinator refresh.",
+            account_label,
+            metrics.last_refresh_seconds,
+        )
+        for name, value in service_metrics.items():
+            add(
+                f"service_{name}_total",
+                "counter",
+                f"Cached Fit service {name.replace('_', ' ')}.",
+                account_label,
+                value,
+            )
+        for source, source_metrics in sorted(metrics.sources.items()):
+            labels = f'{account_label},source="{_escape(source)}"'
+            for name, value in asdict(source_metrics).items():
+                description = name.removeprefix("last_").replace("_", " ")
+                if name.startswith("last_"):
+                    add(
+                        f"source_{name}",
+                        "gauge",
+                        f"Last request {description}.",
+                        labels,
+                        value,
+                    )
+                else:
+                    add(
+                        f"source_{name}_total",
+                        "counter",
+                        f"Total {description}.",
+                        labels,
+                        value,
+                    )
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
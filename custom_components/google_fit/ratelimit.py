@@ -0,0 +1,135 @@
+"""Rate limiting and retrying of Google Fit API calls."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+import math
+import random
+import time
+
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
+from googleapiclient.http import HttpError
+from httplib2 import HttpLib2Error
+
+from .const import (
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY_SECONDS,
+)
+
+# Failures of the connection rather than the API call, from aiohttp, httplib2 and
+# the sockets beneath them. These are raised instead of an HTTP error response.
+TRANSIENT_ERRORS = (ClientConnectionError, HttpLib2Error, OSError, TimeoutError)
+
+
+class TokenBucket:
+    """Limit the rate of API calls to a quota.
+
+    The bucket holds up to capacity tokens and refills at rate tokens per second.
+    Every API call takes one token, waiting for it if the bucket is empty. Waiters
+    are served in order, so a large batch cannot be starved by single calls.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initialise a full bucket."""
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._updated) * self._rate, self._capacity
+        )
+        self._updated = now
+
+    async def async_acquire(self, tokens: float = 1) -> None:
+        """Wait until the given number of tokens are available and take them.
+
+        Requests for more than the capacity wait for a full bucket.
+        """
+        tokens = min(tokens, self._capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+def get_error_status(err: Exception) -> int | None:
+    """Return the HTTP status of a failed API call, or None if it has none."""
+    if isinstance(err, HttpError):
+        return err.status_code
+    if isinstance(err, ClientResponseError):
+        return err.status
+    return None
+
+
+def is_retryable(err: Exception) -> bool:
+    """Return whether a failed API call may succeed if it is made again.
+
+    Rate limited calls, server errors and connection failures are retried.
+    Anything else, including authentication failures, is not.
+    """
+    if isinstance(err, TRANSIENT_ERRORS):
+        return True
+    status = get_error_status(err)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _get_retry_after(err: Exception) -> float | None:
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    if isinstance(err, HttpError):
+        value = err.resp.get("retry-after")
+    elif isinstance(err, ClientResponseError) and err.headers is not None:
+        value = err.headers.get("Retry-After")
+    else:
+        value = None
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0)
+
+
+def get_retry_delay(err: Exception, attempt: int) -> float:
+    """Return how long to wait before retrying a failed API call.
+
+    Honours the Retry-After header if the server sent one. Otherwise backs off
+    exponentially from the base delay with full jitter, so accounts which failed
+    together do not retry together. attempt counts from 0.
+    """
+    retry_after = _get_retry_after(err)
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(
+        0, min(RETRY_BASE_DELAY_SECONDS * 2**attempt, RETRY_MAX_DELAY_SECONDS)
+    )
+
+
+def get_retry_wait(
+    errors: Iterable[Exception], attempt: int, time_left: float = math.inf
+) -> float | None:
+    """Return how long to wait before retrying failed API calls, or None to give up.
+
+    The wait is the longest asked for by any of the errors. Calls are given up on
+    once they have been made the maximum number of times, or if the wait would use
+    up the time left. attempt counts from 0.
+    """
+    if attempt + 1 >= RETRY_MAX_ATTEMPTS:
+        return None
+    delay = max(get_retry_delay(err, attempt) for err in errors)
+    return delay if delay < time_left else None
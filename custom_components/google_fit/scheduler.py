@@ -0,0 +1,289 @@
+"""Per data source polling scheduler for Google Fit."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import math
+import threading
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .api_types import FitResponse, GoogleFitSensorDescription
+from .ratelimit import TokenBucket
+from .const import (
+    DATA_ACCOUNT_SCHEDULER,
+    DOMAIN,
+    GLOBAL_MAX_CONCURRENT_REQUESTS,
+    LOGGER,
+    RATE_LIMIT_PROJECT_BURST,
+    RATE_LIMIT_PROJECT_PER_DAY,
+    SCHEDULER_BACKOFF_FACTOR,
+    SCHEDULER_CADENCE_SMOOTHING,
+    SCHEDULER_GRACE_SECONDS,
+    SCHEDULER_MAX_INFREQUENT_INTERVAL_SECONDS,
+    SCHEDULER_MIN_WAKE_SECONDS,
+    SOURCE_MAX_ERRORS,
+)
+
+
+def get_last_modified_millis(response: FitResponse) -> int:
+    """Return the most recent modification time found in an API response."""
+    items = (
+        response.get("point")
+        or response.get("insertedDataPoint")
+        or response.get("session")
+        or []
+    )
+    return max((int(item.get("modifiedTimeMillis", 0)) for item in items), default=0)
+
+
+@dataclass
+class SourceSchedule:
+    """Polling schedule for a single data source."""
+
+    min_interval: float
+    max_interval: float
+    interval: float
+    next_due: float = 0
+    last_modified_millis: int = 0
+    # Smoothed time in seconds between observed changes to the source
+    cadence: float | None = None
+    # Number of times in a row the source failed, and why it last failed
+    errors: int = 0
+    last_error: str | None = None
+
+
+class SensorScheduler:
+    """Decide which data sources are due to be queried.
+
+    Every data source has its own next due time. Sources for normal sensors are
+    polled every update interval and sources for infrequently updated sensors every
+    update interval multiplied by the infrequent multiplier.
+
+    If adaptive, the interval for each source is learnt from the modification times
+    Google reports for its data. A source that has changed since it was last polled
+    goes back to the update interval, while one that has not changed backs off, up to
+    its smoothed change cadence or the maximum interval.
+    """
+
+    def __init__(
+        self,
+        entities: tuple[GoogleFitSensorDescription, ...],
+        update_interval: float,
+        infrequent_multiplier: int,
+        adaptive: bool,
+    ) -> None:
+        """Initialise a schedule for the sources of the given sensors.
+
+        Intervals are in seconds.
+        """
+        self._adaptive = adaptive
+        self._update_interval = update_interval
+        self._sources: dict[str, SourceSchedule] = {}
+        for entity in entities:
+            if entity.source in self._sources:
+                continue
+            if entity.infrequent_update:
+                interval = update_interval * infrequent_multiplier
+                max_interval = max(interval, SCHEDULER_MAX_INFREQUENT_INTERVAL_SECONDS)
+            else:
+                interval = update_interval
+                max_interval = update_interval * infrequent_multiplier
+            self._sources[entity.source] = SourceSchedule(
+                min_interval=update_interval if adaptive else interval,
+                max_interval=max_interval if adaptive else interval,
+                interval=interval,
+            )
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        """Return what has been learnt about each source, to be persisted.
+
+        Due times are converted to wall clock time, so they survive a restart.
+        """
+        offset = time.time() - time.monotonic()
+        return {
+            source: {
+                "next_due": schedule.next_due + offset if schedule.next_due else 0,
+                "interval": schedule.interval,
+                "last_modified_millis": schedule.last_modified_millis,
+                "cadence": schedule.cadence,
+            }
+            for source, schedule in self._sources.items()
+        }
+
+    def restore(self, data: dict[str, dict[str, Any]]) -> None:
+        """Restore state previously returned by as_dict()."""
+        for source, saved in data.items():
+            schedule = self._sources.get(source)
+            if schedule is None:
+                continue
+            if self._adaptive:
+                schedule.interval = min(
+                    max(saved["interval"], schedule.min_interval),
+                    schedule.max_interval,
+                )
+                schedule.cadence = saved["cadence"]
+            schedule.last_modified_millis = saved["last_modified_millis"]
+            if saved["next_due"]:
+                schedule.next_due = time.monotonic() + min(
+                    max(saved["next_due"] - time.time(), 0), schedule.interval
+                )
+
+    def is_due(self, source: str) -> bool:
+        """Return whether the given source should be queried now."""
+        schedule = self._sources.get(source)
+        if schedule is None:
+            return True
+        return schedule.next_due <= time.monotonic() + SCHEDULER_GRACE_SECONDS
+
+    def record(self, source: str, last_modified_millis: int) -> None:
+        """Record that a source was successfully queried and schedule it again."""
+        schedule = self._sources.get(source)
+        if schedule is None:
+            return
+
+        if self._adaptive and schedule.last_modified_millis > 0:
+            if last_modified_millis > schedule.last_modified_millis:
+                gap = (last_modified_millis - schedule.last_modified_millis) / 1000
+                schedule.cadence = (
+                    gap
+                    if schedule.cadence is None
+                    else SCHEDULER_CADENCE_SMOOTHING * gap
+                    + (1 - SCHEDULER_CADENCE_SMOOTHING) * schedule.cadence
+                )
+                schedule.interval = schedule.min_interval
+            else:
+                limit = schedule.max_interval
+                if schedule.cadence is not None:
+                    limit = min(limit, max(schedule.min_interval, schedule.cadence))
+                schedule.interval = max(
+                    schedule.min_interval,
+                    min(schedule.interval * SCHEDULER_BACKOFF_FACTOR, limit),
+                )
+
+        schedule.last_modified_millis = max(
+            schedule.last_modified_millis, last_modified_millis
+        )
+        schedule.errors = 0
+        schedule.next_due = time.monotonic() + schedule.interval
+        LOGGER.debug("Next query for %s in %us", source, schedule.interval)
+
+    def record_failure(self, source: str, error: str) -> None:
+        """Record that a source could not be queried and schedule a retry.
+
+        The retry is after the update interval, doubling with every failure in a
+        row, but never later than the source would normally be queried.
+        """
+        schedule = self._sources.get(source)
+        if schedule is None:
+            return
+        schedule.errors += 1
+        schedule.last_error = error
+        retry = min(
+            self._update_interval * 2 ** (schedule.errors - 1),
+            max(schedule.interval, self._update_interval),
+        )
+        schedule.next_due = time.monotonic() + retry
+        LOGGER.debug(
+            "Query for %s failed %u times in a row. Retrying in %us",
+            source,
+            schedule.errors,
+            retry,
+        )
+
+    def get_status(self) -> dict[str, dict[str, Any]]:
+        """Return the current schedule and health of each source."""
+        now = time.monotonic()
+        return {
+            source: {
+                "interval": schedule.interval,
+                "seconds_until_due": max(schedule.next_due - now, 0),
+                "cadence": schedule.cadence,
+                "last_modified_millis": schedule.last_modified_millis,
+                "errors": schedule.errors,
+                "last_error": schedule.last_error,
+            }
+            for source, schedule in self._sources.items()
+        }
+
+    def is_failing(self, source: str) -> bool:
+        """Return whether a source has failed too many times in a row."""
+        schedule = self._sources.get(source)
+        return schedule is not None and schedule.errors >= SOURCE_MAX_ERRORS
+
+    def seconds_until_next_due(self, available: set[str] | None = None) -> float:
+        """Return the time until the next source is due to be queried.
+
+        If the sources the account has are given, only those are considered, as the
+        others are never queried and so never rescheduled.
+        """
+        next_due = [
+            schedule.next_due
+            for source, schedule in self._sources.items()
+            if available is None or source in available
+        ]
+        if not next_due:
+            return self._update_interval
+        return max(min(next_due) - time.monotonic(), 0)
+
+
+class AccountScheduler:
+    """Polling state shared by every Google Fit account.
+
+    Accounts are given evenly spaced phases within their update interval, and each
+    account only wakes up on its own phase, so several accounts do not all query
+    Google at the same moment. API calls from every account share a global limit on
+    the number in flight and the project quota, and the googleapiclient transports
+    share one HTTP connection per executor thread.
+    """
+
+    def __init__(
+        self, max_concurrent_requests: int = GLOBAL_MAX_CONCURRENT_REQUESTS
+    ) -> None:
+        """Initialise with no accounts."""
+        self._accounts: dict[str, None] = {}
+        self.request_slots = asyncio.Semaphore(max_concurrent_requests)
+        self.project_quota = TokenBucket(
+            RATE_LIMIT_PROJECT_PER_DAY / (24 * 60 * 60), RATE_LIMIT_PROJECT_BURST
+        )
+        self.connections = threading.local()
+
+    @callback
+    def register(self, entry_id: str) -> CALLBACK_TYPE:
+        """Add an account and return a callback which removes it again."""
+        self._accounts[entry_id] = None
+
+        @callback
+        def _unregister() -> None:
+            self._accounts.pop(entry_id, None)
+
+        return _unregister
+
+    def get_wait_seconds(self, entry_id: str, interval: float, wait: float) -> float:
+        """Return how long an account should wait to be woken on its own phase.
+
+        wait is the time until the account next has a source due. It is delayed to
+        the next phase of the account, less the scheduler grace period as sources
+        due within that are queried early anyway. Intervals are in seconds.
+        """
+        accounts = list(self._accounts)
+        if len(accounts) < 2 or entry_id not in accounts:
+            return wait
+        phase = interval * accounts.index(entry_id) / len(accounts)
+        now = time.time()
+        earliest = now + wait - SCHEDULER_GRACE_SECONDS
+        wake = phase + math.ceil((earliest - phase) / interval) * interval
+        return max(wake - now, SCHEDULER_MIN_WAKE_SECONDS)
+
+
+@callback
+def get_account_scheduler(hass: HomeAssistant) -> AccountScheduler:
+    """Return the scheduler shared by all Google Fit config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_ACCOUNT_SCHEDULER not in domain_data:
+        domain_data[DATA_ACCOUNT_SCHEDULER] = AccountScheduler()
+    scheduler: AccountScheduler = domain_data[DATA_ACCOUNT_SCHEDULER]
+    return scheduler
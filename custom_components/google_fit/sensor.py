@@ -8,10 +8,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.exceptions import ConfigEntryAuthFailed
 
-from .const import DOMAIN, ENTITY_DESCRIPTIONS
+from .const import DIAGNOSTIC_DESCRIPTIONS, DOMAIN
 from .coordinator import Coordinator
 from .entity import GoogleFitEntity
-from .api_types import GoogleFitSensorDescription
+from .api_types import DiagnosticSensorDescription, GoogleFitSensorDescription
 
 
 async def async_setup_entry(
@@ -20,12 +20,37 @@ async def async_setup_entry(
     """Set up the sensor platform."""
     entry_data = hass.data[DOMAIN][entry.entry_id]
     coordinator: Coordinator = entry_data.get("coordinator")
+    added_data_keys: set[str] = set()
+
+    @callback
+    def _async_add_available_sensors() -> None:
+        """Add sensors for any data sources which have become available."""
+        new_descriptions = [
+            entity_description
+            for entity_description in coordinator.entity_descriptions
+            if entity_description.data_key not in added_data_keys
+            and coordinator.is_source_available(entity_description.source)
+        ]
+        if not new_descriptions:
+            return
+        added_data_keys.update(
+            entity_description.data_key for entity_description in new_descriptions
+        )
+        async_add_devices(
+            GoogleFitBlueprintSensor(
+                coordinator=coordinator,
+                entity_description=entity_description,
+            )
+            for entity_description in new_descriptions
+        )
+
+    _async_add_available_sensors()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_available_sensors))
     async_add_devices(
-        GoogleFitBlueprintSensor(
-            coordinator=coordinator,
-            entity_description=entity_description,
+        GoogleFitDiagnosticSensor(
+            coordinator=coordinator, entity_description=entity_description
         )
-        for entity_description in ENTITY_DESCRIPTIONS
+        for entity_description in DIAGNOSTIC_DESCRIPTIONS
     )
 
 
@@ -54,20 +79,63 @@ class GoogleFitBlueprintSensor(GoogleFitEntity, SensorEntity):
             raise ConfigEntryAuthFailed(
                 "No valid OAuth Session associated for this Google Fit Sensor"
             )
+        self._was_available = True
+        # Start from the last known value, which may have been restored from cache
+        if coordinator.current_data is not None:
+            self._attr_native_value = coordinator.current_data.get(
+                entity_description.data_key
+            )
 
     @property
     def available(self) -> bool:
         """Return if entity is available."""
-        return self.coordinator.last_update_success
+        return self.coordinator.last_update_success and not (
+            self.coordinator.is_source_failing(self.entity_description.source)
+        )
 
     def _read_value(self) -> None:
+        value = None
         if self.coordinator.current_data is not None:
             value = self.coordinator.current_data.get(self.entity_description.data_key)
             if value is not None:
                 self._attr_native_value = value
-                self.async_write_ha_state()
+        # Also write the state when only availability changed, e.g. when this
+        # sensor's data source started or stopped failing
+        available = self.available
+        if value is not None or available != self._was_available:
+            self._was_available = available
+            self.async_write_ha_state()
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         self._read_value()
+
+
+class GoogleFitDiagnosticSensor(GoogleFitEntity, SensorEntity):
+    """Google Fit sensor showing how the API is being queried."""
+
+    entity_description: DiagnosticSensorDescription
+    coordinator: Coordinator
+
+    def __init__(
+        self,
+        coordinator: Coordinator,
+        entity_description: DiagnosticSensorDescription,
+    ) -> None:
+        """Initialise the sensor class."""
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._attr_unique_id = (
+            f"{coordinator.config_entry.entry_id}_{entity_description.key}"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available, which it always is."""
+        return True
+
+    @property
+    def native_value(self) -> int | float:
+        """Return the current value of the metric."""
+        return getattr(self.coordinator.metrics, self.entity_description.metric)
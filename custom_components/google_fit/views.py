@@ -0,0 +1,51 @@
+"""HTTP views for Google Fit."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_PROMETHEUS_METRICS,
+    DEFAULT_PROMETHEUS_METRICS,
+    DOMAIN,
+    METRICS_URL,
+)
+from .metrics import format_prometheus
+
+
+class GoogleFitMetricsView(HomeAssistantView):
+    """Serve API metrics in the Prometheus text format.
+
+    Only accounts with Prometheus metrics enabled are included. The view cannot be
+    removed once registered, so it returns 404 if no account has them enabled.
+    """
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the view."""
+        self._hass = hass
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics of every account which has them enabled."""
+        accounts = {}
+        for entry in self._hass.config_entries.async_entries(DOMAIN):
+            entry_data = self._hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if entry_data is None or not entry.options.get(
+                CONF_PROMETHEUS_METRICS, DEFAULT_PROMETHEUS_METRICS
+            ):
+                continue
+            accounts[entry.title] = (
+                entry_data["coordinator"].metrics,
+                asdict(entry_data["auth"].service_metrics),
+            )
+        if not accounts:
+            return web.Response(status=404)
+        return web.Response(text=format_prometheus(accounts), content_type="text/plain")
@@ -0,0 +1 @@
+"""Tests for the Google Fit integration."""
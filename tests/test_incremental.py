@@ -0,0 +1,54 @@
+"""Tests for incremental fetching of Google Fit data."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from custom_components.google_fit.const import NANOSECONDS_SECONDS_CONVERSION
+from custom_components.google_fit.incremental import IncrementalSum
+
+
+def _nanos(time: datetime) -> int:
+    """Return a time in nanoseconds."""
+    return int(time.timestamp()) * NANOSECONDS_SECONDS_CONVERSION
+
+
+def _point(start: datetime, end: datetime, value: int) -> dict:
+    """Return a data point as returned by the API."""
+    return {
+        "startTimeNanos": str(_nanos(start)),
+        "endTimeNanos": str(_nanos(end)),
+        "value": [{"intVal": value}],
+    }
+
+
+def test_overlap_replaces_resplit_points() -> None:
+    """Test a point re-split by Google in the overlap replaces the held points."""
+    # A rolling window, so the test cannot cross the midnight of a daily sum
+    steps = IncrementalSum(period_seconds=24 * 60 * 60)
+    now = datetime.now()
+
+    steps.get_dataset_id(now)
+    total = steps.update(
+        {
+            "point": [
+                _point(now - timedelta(hours=2), now - timedelta(hours=1), 50),
+                _point(now - timedelta(minutes=30), now - timedelta(minutes=20), 100),
+            ]
+        },
+        is_int=True,
+    )
+    assert total == 150
+
+    later = now + timedelta(minutes=5)
+    start, _ = steps.get_dataset_id(later).split("-")
+    assert int(start) < _nanos(now - timedelta(minutes=20))
+    total = steps.update(
+        {
+            "point": [
+                _point(now - timedelta(minutes=30), now - timedelta(minutes=10), 180),
+            ]
+        },
+        is_int=True,
+    )
+    assert total == 230